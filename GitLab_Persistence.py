@@ -1,16 +1,109 @@
 import os
 import json
+import gzip
+import base64
+import posixpath
 import requests
 from urllib.parse import quote, unquote
 
 # --- Configuration ---
-GITLAB_PROJECT_ID = os.getenv("GITLAB_PROJECT_ID")
+GITLAB_PROJECT_ID = os.getenv("GITLAB_PROJECT_ID") or os.getenv("GITLAB_REPO")
 GITLAB_TOKEN = os.getenv("GITLAB_TOKEN")
 BRANCH = os.getenv("GITLAB_BRANCH", "main")
+# Self-hosted GitLab, or gitlab_standin.py for local testing
+GITLAB_API_BASE = os.getenv("GITLAB_API_BASE", "https://gitlab.com/api/v4").rstrip("/")
 
-API_BASE = f"https://gitlab.com/api/v4/projects/{GITLAB_PROJECT_ID}"
+def _project_api(project_id):
+    return f"{GITLAB_API_BASE}/projects/{quote(str(project_id), safe='')}"
+
+API_BASE = _project_api(GITLAB_PROJECT_ID)
 HEADERS = {"PRIVATE-TOKEN": GITLAB_TOKEN}
 
+def configure(project_id=None, token=None, branch=None, api_base=None):
+    """Override the environment configuration (e.g. from Streamlit secrets)."""
+    global GITLAB_PROJECT_ID, GITLAB_TOKEN, BRANCH, GITLAB_API_BASE, API_BASE, HEADERS
+    if api_base:
+        GITLAB_API_BASE = api_base.rstrip("/")
+    if project_id:
+        GITLAB_PROJECT_ID = project_id
+    if project_id or api_base:
+        API_BASE = _project_api(GITLAB_PROJECT_ID)
+    if token:
+        GITLAB_TOKEN = token
+        HEADERS = {"PRIVATE-TOKEN": token}
+    if branch:
+        BRANCH = branch
+
+# --- Compressed payloads ---
+# GITLAB_COMPRESSION = "gzip" or "zstd" stores files larger than
+# GITLAB_COMPRESS_MIN_BYTES compressed (sent base64-encoded). Reads detect the
+# format from the magic bytes, so plain legacy files keep working.
+GITLAB_COMPRESSION = os.getenv("GITLAB_COMPRESSION", "").strip().lower()
+GITLAB_COMPRESS_MIN_BYTES = int(os.getenv("GITLAB_COMPRESS_MIN_BYTES", "4096"))
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+def compress_payload(content: bytes, method=None) -> bytes:
+    method = GITLAB_COMPRESSION if method is None else method
+    if method == "gzip":
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    if method == "zstd":
+        return _zstd().ZstdCompressor(level=19).compress(content)
+    if method:
+        raise ValueError(f"Unknown GITLAB_COMPRESSION {method!r}; expected 'gzip' or 'zstd'")
+    return content
+
+def decompress_payload(raw: bytes) -> bytes:
+    if raw.startswith(GZIP_MAGIC):
+        return gzip.decompress(raw)
+    if raw.startswith(ZSTD_MAGIC):
+        return _zstd().ZstdDecompressor().decompress(raw, max_output_size=1 << 30)
+    return raw
+
+def _encode_for_upload(content):
+    """(content, encoding) for the files/commits API."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    if GITLAB_COMPRESSION and len(content) >= GITLAB_COMPRESS_MIN_BYTES:
+        return base64.b64encode(compress_payload(content)).decode("ascii"), "base64"
+    try:
+        return content.decode("utf-8"), "text"
+    except UnicodeDecodeError:  # binary files such as history offset sidecars
+        return base64.b64encode(content).decode("ascii"), "base64"
+
+def _accept_encoding():
+    """Transfer encodings requests/urllib3 can decode here (br and zstd need optional packages)."""
+    encodings = ["gzip", "deflate"]
+    for module, name in (("brotli", "br"), ("zstandard", "zstd")):
+        try:
+            __import__(module)
+            encodings.append(name)
+        except ImportError:
+            pass
+    return ", ".join(encodings)
+
+DOWNLOAD_HEADERS = {"Accept-Encoding": _accept_encoding()}
+# GitLab caps the number of files in a compare; a diff that long may be cut short
+COMPARE_MAX_FILES = 1000
+
+# --- Leagues ---
+# Same layout as storage.league_root: the default league is the flat
+# leaderboards/ folder, every other league has leaderboards/leagues/<league>/.
+DEFAULT_LEAGUE = "default"
+
+def league_dir(league=None):
+    if not league or league == DEFAULT_LEAGUE:
+        return "leaderboards"
+    return f"leaderboards/leagues/{league}"
+
 # --- Helpers for clean game names ---
 def _normalize_game_basename(name: str) -> str:
     if not name:
@@ -23,25 +116,20 @@ def _normalize_game_basename(name: str) -> str:
             name = name[: -len(suffix)]
     return name
 
-def _leaderboard_path_for_game(game_name: str) -> str:
+def _leaderboard_path_for_game(game_name: str, league=None) -> str:
     base = _normalize_game_basename(game_name)
-    return f"leaderboards/{base}_leaderboard.json"
-
-def _history_path_for_game(game_name: str) -> str:
-    base = _normalize_game_basename(game_name)
-    return f"leaderboards/{base}_history.json"
+    return f"{league_dir(league)}/{base}_leaderboard.json"
 
 # --- GitLab raw file utilities ---
 def gitlab_raw_get(file_path):
-    url_path = quote(file_path, safe="")
-    url = f"{API_BASE}/repository/files/{url_path}/raw?ref={BRANCH}"
-    resp = requests.get(url, headers=HEADERS, timeout=15)
-    if resp.status_code == 200:
+    status, content = gitlab_raw_get_bytes(file_path)
+    if status == 200:
+        text = content.decode("utf-8", errors="replace")
         try:
-            return 200, json.loads(resp.text)
+            return 200, json.loads(text)
         except Exception:
-            return 200, resp.text
-    return resp.status_code, resp.text
+            return 200, text
+    return status, content.decode("utf-8", errors="replace")
 
 def gitlab_file_exists(file_path):
     url_path = quote(file_path, safe="")
@@ -50,14 +138,14 @@ def gitlab_file_exists(file_path):
     return resp.status_code == 200
 
 def gitlab_create_or_update_file(file_path, data, commit_message):
-    content = json.dumps(data, indent=2, ensure_ascii=False)
+    content, encoding = _encode_for_upload(json.dumps(data, indent=2, ensure_ascii=False))
     url_path = quote(file_path, safe="")
     api_path = f"{API_BASE}/repository/files/{url_path}"
     payload = {
         "branch": BRANCH,
         "content": content,
         "commit_message": commit_message,
-        "encoding": "text",
+        "encoding": encoding,
     }
     if gitlab_file_exists(file_path):
         resp = requests.put(api_path, headers=HEADERS, json=payload, timeout=20)
@@ -67,6 +155,111 @@ def gitlab_create_or_update_file(file_path, data, commit_message):
         raise RuntimeError(f"GitLab API error {resp.status_code}: {resp.text}")
     return resp.json()
 
+def gitlab_raw_get_bytes(file_path, ref=None):
+    """Returns (status, bytes) at `ref` (default: the branch), transparently decompressing compressed payloads."""
+    url_path = quote(file_path, safe="")
+    url = f"{API_BASE}/repository/files/{url_path}/raw?ref={quote(ref or BRANCH, safe='')}"
+    resp = requests.get(url, headers={**HEADERS, **DOWNLOAD_HEADERS}, timeout=15)
+    if resp.status_code == 200:
+        return 200, decompress_payload(resp.content)
+    return resp.status_code, resp.content
+
+def gitlab_list_tree(path):
+    """Names of the files (not folders) directly under `path` on the branch."""
+    names = []
+    page = 1
+    while True:
+        url = f"{API_BASE}/repository/tree?ref={BRANCH}&path={quote(path, safe='')}&per_page=100&page={page}"
+        resp = requests.get(url, headers=HEADERS, timeout=15)
+        if resp.status_code != 200:
+            return names
+        entries = resp.json()
+        names.extend(e["name"] for e in entries if e.get("type", "blob") == "blob")
+        if len(entries) < 100:
+            return names
+        page += 1
+
+def gitlab_list_files(path, ref=None):
+    """Paths of every file under `path` (recursively) at `ref` (default: the branch)."""
+    paths = []
+    page = 1
+    while True:
+        url = (f"{API_BASE}/repository/tree?ref={quote(ref or BRANCH, safe='')}&path={quote(path, safe='')}"
+               f"&recursive=true&per_page=100&page={page}")
+        resp = requests.get(url, headers=HEADERS, timeout=15)
+        if resp.status_code == 404:
+            return paths
+        if resp.status_code != 200:
+            raise RuntimeError(f"GitLab API error {resp.status_code}: {resp.text}")
+        entries = resp.json()
+        paths.extend(e["path"] for e in entries if e.get("type", "blob") == "blob")
+        if len(entries) < 100:
+            return paths
+        page += 1
+
+# --- Branch head and deltas (gitlab_mirror.py) ---
+def gitlab_head_sha():
+    """Commit SHA at the head of the branch, or None if the branch does not exist yet."""
+    resp = requests.get(f"{API_BASE}/repository/branches/{quote(BRANCH, safe='')}", headers=HEADERS, timeout=15)
+    if resp.status_code == 404:
+        return None
+    if resp.status_code != 200:
+        raise RuntimeError(f"GitLab API error {resp.status_code}: {resp.text}")
+    return resp.json()["commit"]["id"]
+
+def gitlab_compare(from_sha, to_sha):
+    """
+    Files changed between two commits as {path: deleted?}, or None when GitLab
+    could not give a complete answer (timeout, unknown commit, capped diff).
+    """
+    url = f"{API_BASE}/repository/compare?from={quote(from_sha, safe='')}&to={quote(to_sha, safe='')}&straight=true"
+    resp = requests.get(url, headers=HEADERS, timeout=30)
+    if resp.status_code != 200:
+        return None
+    data = resp.json()
+    diffs = data.get("diffs", [])
+    if data.get("compare_timeout") or len(diffs) >= COMPARE_MAX_FILES:
+        return None
+    changes = {}
+    for diff in diffs:
+        if diff.get("renamed_file") or diff.get("deleted_file"):
+            changes[diff["old_path"]] = True
+        if not diff.get("deleted_file"):
+            changes[diff["new_path"]] = False
+    return changes
+
+def gitlab_commit_files(files, commit_message, present=None):
+    """
+    Write several files in a single commit.
+    `files` maps repository paths to str/bytes content, or None to delete the file.
+    `present` is the set of those paths known to exist (saves listing their folders).
+    """
+    if present is None:
+        existing = {}
+        for directory in {posixpath.dirname(p) for p in files}:
+            existing[directory] = set(gitlab_list_tree(directory))
+        present = {p for p in files if posixpath.basename(p) in existing[posixpath.dirname(p)]}
+    actions = []
+    for file_path, content in files.items():
+        if content is None:
+            if file_path in present:
+                actions.append({"action": "delete", "file_path": file_path})
+            continue
+        content, encoding = _encode_for_upload(content)
+        actions.append({
+            "action": "update" if file_path in present else "create",
+            "file_path": file_path,
+            "content": content,
+            "encoding": encoding,
+        })
+    if not actions:
+        return None
+    payload = {"branch": BRANCH, "commit_message": commit_message, "actions": actions}
+    resp = requests.post(f"{API_BASE}/repository/commits", headers=HEADERS, json=payload, timeout=30)
+    if resp.status_code not in (200, 201):
+        raise RuntimeError(f"GitLab API error {resp.status_code}: {resp.text}")
+    return resp.json()
+
 # --- NEW: generic file reader ---
 def gitlab_read_file(file_path):
     status, data = gitlab_raw_get(file_path)
@@ -80,10 +273,10 @@ def gitlab_read_file(file_path):
     return {}
 
 # --- Players ---
-def load_players_from_git():
+def load_players_from_git(league=None):
     """Always returns dict with key 'players'."""
     try:
-        data = gitlab_read_file("leaderboards/players.json")
+        data = gitlab_read_file(f"{league_dir(league)}/players.json")
         if isinstance(data, dict) and "players" in data and isinstance(data["players"], list):
             return data
         elif isinstance(data, list):
@@ -93,47 +286,32 @@ def load_players_from_git():
     except Exception:
         return {"players": []}
 
-def save_players_to_git(players_dict, commit_message="Update players list"):
+def save_players_to_git(players_dict, commit_message="Update players list", league=None):
     if isinstance(players_dict, list):
         players_dict = {"players": players_dict}
-    gitlab_create_or_update_file("leaderboards/players.json", players_dict, commit_message)
+    gitlab_create_or_update_file(f"{league_dir(league)}/players.json", players_dict, commit_message)
 
 # --- Leaderboard ---
-def load_leaderboard_from_git(game_name):
+def load_leaderboard_from_git(game_name, league=None):
     try:
-        data = gitlab_read_file(f"leaderboards/{game_name}_leaderboard.json")
+        data = gitlab_read_file(_leaderboard_path_for_game(game_name, league))
         if not isinstance(data, dict):
             return {}
         return data
     except Exception:
         return {}
 
-def save_leaderboard_to_git(game_name, leaderboard_dict, commit_message=None):
-    file_path = _leaderboard_path_for_game(game_name)
+def save_leaderboard_to_git(game_name, leaderboard_dict, commit_message=None, league=None):
+    file_path = _leaderboard_path_for_game(game_name, league)
     if commit_message is None:
         commit_message = f"Update {game_name} leaderboard"
     gitlab_create_or_update_file(file_path, leaderboard_dict, commit_message)
 
-def gitlab_list_leaderboards_dir():
-    url = f"{API_BASE}/repository/tree?ref={BRANCH}&path=leaderboards"
-    resp = requests.get(url, headers=HEADERS, timeout=15)
-    if resp.status_code == 200:
-        return [f["name"] for f in resp.json() if f["name"].endswith("_leaderboard.json")]
-    return []
-
-# --- History ---
-def load_history_from_git(game_name):
-    file_path = _history_path_for_game(game_name)
-    status, data = gitlab_raw_get(file_path)
-    if status == 200:
-        if isinstance(data, list):
-            return {"matches": data}
-        elif isinstance(data, dict):
-            return data
-    return {"matches": []}
+def gitlab_list_leaderboards_dir(league=None):
+    return [name for name in gitlab_list_tree(league_dir(league)) if name.endswith("_leaderboard.json")]
 
-def save_history_to_git(game_name, history_dict, commit_message=None):
-    file_path = _history_path_for_game(game_name)
-    if commit_message is None:
-        commit_message = f"Update {game_name} history"
-    gitlab_create_or_update_file(file_path, history_dict, commit_message)
+def gitlab_list_leagues():
+    """Registered leagues (leaderboards/leagues.json), the default league first."""
+    data = gitlab_read_file("leaderboards/leagues.json")
+    names = data.get("leagues", []) if isinstance(data, dict) else []
+    return [DEFAULT_LEAGUE, *sorted(set(names) - {DEFAULT_LEAGUE})]
@@ -0,0 +1,361 @@
+"""
+Read-only JSON API for leaderboards, served from memory.
+
+    py api_server.py                      # http://0.0.0.0:8080, GitLab backend
+    py api_server.py --port 9000 --refresh 5
+
+Endpoints (GET):
+    /games                               games with player/match counts and versions
+    /games/{game}/leaderboard?top=K      ranked players (all without top)
+    /games/{game}/matches?cursor=N&limit=L
+                                         matches newest first, starting below match
+                                         number N; the response carries next_cursor
+    /version                             {game: version}, the cheap "anything new?" check
+    /events?game=G                       server-sent change feed (see change_feed.py)
+POST /games/{game}/changed               re-read a game now (sent by writers)
+
+The POST only triggers a reload, but anyone able to send it could make the
+server re-read storage in a loop. With LEADERBOARD_API_SECRET set it must carry
+the same value in X-Leaderboard-Secret; without one it is only accepted from
+loopback, so a server exposed to the network needs the secret for writers on
+other machines (and behind a reverse proxy, which connects from loopback).
+top, cursor and limit must be non-negative integers (400 otherwise).
+
+One asyncio event loop serves every client, so hundreds of phones refreshing
+the board cost one process and no per-client storage reads. Every game's
+ratings and its newest matches are kept in memory and re-checked every
+--refresh seconds (the shard cache means only changed shards are downloaded).
+Responses carry an ETag tied to the game's version, and rendered bodies are
+cached until the version changes (at most MAX_CACHED_RESPONSES per game, keyed
+by the parsed parameters), so a repeat request is a dictionary lookup or a
+bare 304.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from change_feed import SECRET_HEADER, api_secret, change_event, format_sse, game_version
+from ratings import conservative, stats_of
+from storage import get_storage
+
+RECENT_IN_MEMORY = 500
+DEFAULT_PAGE = 20
+MAX_PAGE = 200
+MAX_REQUEST_BYTES = 16 * 1024
+KEEP_ALIVE_SECONDS = 30
+EVENT_BACKLOG = 200
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE = 100
+MAX_CACHED_RESPONSES = 64
+PAGE_PARAMS = {"leaderboard": ("top",), "matches": ("cursor", "limit")}
+
+REASONS = {
+    200: "OK", 202: "Accepted", 304: "Not Modified", 400: "Bad Request",
+    403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+}
+
+
+class GameState:
+    """Ranked leaderboard and newest matches of one game at one version."""
+
+    def __init__(self, name, leaderboard, recent, total, version):
+        self.name = name
+        self.leaderboard = leaderboard
+        self.rows = [
+            {"rank": i + 1, "player": player, "mu": r["mu"], "sigma": r["sigma"],
+             "rating": conservative(r["mu"], r["sigma"]), **stats_of(r)}
+            for i, (player, r) in enumerate(
+                sorted(leaderboard.items(), key=lambda kv: conservative(kv[1]["mu"], kv[1]["sigma"]), reverse=True)
+            )
+        ]
+        self.recent = recent      # newest RECENT_IN_MEMORY matches, oldest first
+        self.total = total        # number of matches in the whole history
+        self.version = version
+        self.responses = OrderedDict()  # rendered bodies for this version, least recently used first
+
+
+def load_game(storage, game_name):
+    """A fresh GameState (blocking; run it in a thread)."""
+    leaderboard = storage.load_leaderboard(game_name)
+    index = storage.load_shard_index(game_name)
+    recent = storage.load_history(game_name, recent=RECENT_IN_MEMORY)
+    if index is None:
+        total = len(storage.load_history(game_name))
+    else:
+        total = sum(shard["count"] for shard in index["shards"])
+    return GameState(game_name, leaderboard, recent, total, game_version(leaderboard, index, total))
+
+def page_params(query):
+    """{"top", "cursor", "limit"} as non-negative ints (None if absent), limit capped; raises ValueError."""
+    params = {}
+    for name in ("top", "cursor", "limit"):
+        value = int(query[name][0]) if name in query else None
+        if value is not None and value < 0:
+            raise ValueError(f"{name} must not be negative")
+        params[name] = value
+    if params["limit"] is not None:
+        params["limit"] = min(params["limit"], MAX_PAGE)
+    return params
+
+
+class LeaderboardAPI:
+    def __init__(self, storage, refresh=10.0):
+        self.storage = storage
+        self.refresh = refresh
+        self.games = {}
+        self.events = deque(maxlen=EVENT_BACKLOG)
+        self.next_event_id = 1
+        self.subscribers = set()
+        self._reload_lock = asyncio.Lock()
+        self._started = False
+        self.secret = api_secret()
+
+    # ---- State ----
+    async def reload(self):
+        async with self._reload_lock:
+            names = await asyncio.to_thread(self.storage.list_games)
+            states = await asyncio.gather(*(asyncio.to_thread(load_game, self.storage, n) for n in names))
+            for state in states:
+                self._apply(state)
+            for name in set(self.games) - set(names):
+                del self.games[name]
+        self._started = True
+
+    async def reload_game(self, game_name):
+        async with self._reload_lock:
+            state = await asyncio.to_thread(load_game, self.storage, game_name)
+            if state.name in self.games or state.leaderboard or state.total:
+                self._apply(state)
+
+    def _apply(self, state):
+        old = self.games.get(state.name)
+        if old is None or old.version != state.version:
+            self.games[state.name] = state
+            self.changed(old, state)
+
+    def changed(self, old, new):
+        """Publish a change event whenever a game gets a new version (not for the initial load)."""
+        if not self._started:
+            return
+        event = change_event(
+            new.name,
+            old.leaderboard if old else {}, old.total if old else 0,
+            new.leaderboard, new.total, new.recent, new.version,
+        )
+        event["id"] = self.next_event_id
+        self.next_event_id += 1
+        self.events.append(event)
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop it, the browser reconnects with Last-Event-ID
+                self.subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh)
+            try:
+                await self.reload()
+            except Exception as e:  # keep serving the last good state
+                print(f"Refresh failed: {e}")
+
+    # ---- Routes ----
+    async def route(self, parts, params):
+        """(status, body object or None, etag or None) for a GET request."""
+        if parts == ["version"]:
+            versions = {s.name: s.version for s in self.games.values()}
+            etag = hashlib.sha1(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:16]
+            return 200, {"event_id": self.next_event_id - 1, "games": versions}, etag
+        if parts == ["games"]:
+            etag = hashlib.sha1("".join(s.version for s in self.games.values()).encode()).hexdigest()[:16]
+            body = {"games": [
+                {"name": s.name, "players": len(s.rows), "matches": s.total, "version": s.version}
+                for s in sorted(self.games.values(), key=lambda s: s.name)
+            ]}
+            return 200, body, etag
+        if len(parts) != 3 or parts[0] != "games" or parts[1] not in self.games:
+            return 404, {"error": "not found"}, None
+        state = self.games[parts[1]]
+        if parts[2] == "leaderboard":
+            return 200, {"game": state.name, "version": state.version, "players": state.rows[:params["top"]]}, state.version
+        if parts[2] == "matches":
+            cursor = state.total + 1 if params["cursor"] is None else params["cursor"]
+            limit = DEFAULT_PAGE if params["limit"] is None else params["limit"]
+            return 200, await self.matches_page(state, cursor, limit), state.version
+        return 404, {"error": "not found"}, None
+
+    async def matches_page(self, state, cursor, limit):
+        last = max(0, min(cursor - 1, state.total))
+        first = max(0, last - limit)
+        oldest_in_memory = state.total - len(state.recent)
+        if first >= oldest_in_memory:
+            page = state.recent[first - oldest_in_memory:last - oldest_in_memory]
+        else:
+            def read():
+                with self.storage.history_view(state.name) as view:
+                    return view[first:last]
+            page = await asyncio.to_thread(read)
+        matches = [{"number": first + i + 1, **m} for i, m in enumerate(page)][::-1]
+        return {"game": state.name, "version": state.version, "matches": matches,
+                "next_cursor": first + 1 if first > 0 else None}
+
+    # ---- HTTP ----
+    async def respond(self, target, if_none_match):
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        try:
+            params = page_params(parse_qs(url.query))
+        except ValueError:
+            return 400, b'{"error": "top, cursor and limit must be non-negative integers"}', None
+        game = self.games.get(parts[1]) if len(parts) == 3 and parts[0] == "games" else None
+        # Keyed by the values that shape the body, so "?top=05" and "?top=5&x=1" share an entry
+        key = (parts[2], *(params[name] for name in PAGE_PARAMS.get(parts[2], ()))) if game else None
+        cached = game.responses.get(key) if game else None
+        if cached is None:
+            status, body, etag = await self.route(parts, params)
+            cached = (status, json.dumps(body, ensure_ascii=False).encode("utf-8"), etag and f'"{etag}"')
+            if game and status == 200 and game is self.games.get(game.name):
+                game.responses[key] = cached
+                if len(game.responses) > MAX_CACHED_RESPONSES:
+                    game.responses.popitem(last=False)
+        else:
+            game.responses.move_to_end(key)
+        status, body, etag = cached
+        if etag and if_none_match == etag:
+            return 304, b"", etag
+        return status, body, etag
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                path = urlsplit(target).path
+                if method == "GET" and path == "/events":
+                    await self.stream_events(writer, parse_qs(urlsplit(target).query), headers)
+                    return
+                parts = [unquote(p) for p in path.strip("/").split("/")]
+                if method == "POST" and len(parts) == 3 and parts[0] == "games" and parts[2] == "changed":
+                    if self.may_notify(writer, headers):
+                        asyncio.create_task(self.reload_game(parts[1]))
+                        status, body, etag = 202, b'{"status": "reloading"}', None
+                    else:
+                        status, body, etag = 403, b'{"error": "forbidden"}', None
+                elif method not in ("GET", "HEAD"):
+                    status, body, etag = 405, b'{"error": "method not allowed"}', None
+                else:
+                    status, body, etag = await self.respond(target, headers.get("if-none-match"))
+                response = [
+                    f"HTTP/1.1 {status} {REASONS[status]}",
+                    "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(body)}",
+                    "Cache-Control: no-cache",
+                    "Access-Control-Allow-Origin: *",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if etag:
+                    response.append(f"ETag: {etag}")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode("latin-1"))
+                if method == "GET":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def may_notify(self, writer, headers):
+        """Whether a POST /changed may trigger a reload: matching secret, or loopback when none is set."""
+        if self.secret:
+            return hmac.compare_digest(headers.get(SECRET_HEADER.lower(), "").encode(), self.secret.encode())
+        peer = writer.get_extra_info("peername")
+        try:
+            return ipaddress.ip_address(peer[0]).is_loopback
+        except (TypeError, ValueError):
+            return False
+
+    async def stream_events(self, writer, query, headers):
+        """Server-sent events until the client goes away."""
+        game = query.get("game", [None])[0]
+        wanted = lambda event: event is None or game is None or event["game"] == game
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "X-Accel-Buffering: no\r\n"
+            "Connection: keep-alive\r\n\r\n"
+            "retry: 3000\n\n"
+        ).encode("latin-1"))
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self.subscribers.add(queue)
+        try:
+            last_id = int(headers.get("last-event-id") or 0)
+            for event in self.events:
+                if event["id"] > last_id and wanted(event):
+                    writer.write(format_sse(event))
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    if event is None:
+                        return
+                    if not wanted(event):
+                        continue
+                    writer.write(format_sse(event))
+                await writer.drain()
+        except ValueError:
+            return
+        finally:
+            self.subscribers.discard(queue)
+
+    async def serve(self, host, port):
+        await self.reload()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_BYTES, backlog=1024)
+        print(f"Serving {len(self.games)} game(s) on http://{host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.refresh_forever())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve leaderboards as a read-only JSON API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--refresh", type=float, default=10.0, help="seconds between storage checks")
+    args = parser.parse_args()
+    api = LeaderboardAPI(get_storage("gitlab"), args.refresh)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Check every stored leaderboard against a replay of its recorded history.
+
+    py audit_leaderboards.py                  # report discrepancies (exit code 1 if any)
+    py audit_leaderboards.py scythe unfair    # only these games
+    py audit_leaderboards.py --repair         # rewrite the drifted leaderboards in one commit
+
+A leaderboard can drift from its history: a page write that failed halfway,
+the admin ratings reset, or wins counted differently by older code. Every
+game's history is replayed under its TrueSkill parameters on a process pool
+(largest games first, so the slowest one starts at once). Each player's μ and
+σ are compared within --tolerance, and their aggregates (ratings.STATS) are
+compared exactly. Histories are loaded in parallel threads, so the audit
+takes about as long as the biggest game's replay and is cheap enough to run
+after every deploy.
+--repair writes the replayed leaderboards of the drifted games as one batch.
+It drops their undo journals, which described the drifted entries.
+"""
+import argparse
+import contextlib
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ratings import STATS, game_params, make_env, replay, stats_of
+from storage import encode_leaderboard, get_storage, leaderboard_path
+
+TOLERANCE = 1e-6
+LOAD_WORKERS = 8
+
+def _replay(task):
+    """Worker: the replayed leaderboard of one game."""
+    matches, params = task
+    return replay(matches, make_env(params))
+
+def _differs(a, b, tolerance):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) > tolerance
+    return a != b
+
+def compare(stored, replayed, defaults, tolerance=TOLERANCE):
+    """[(player, field, stored value, replayed value)] where `stored` disagrees with `replayed`."""
+    problems = []
+    for player in sorted(set(stored) | set(replayed)):
+        if player not in stored:
+            problems.append((player, "entry", None, "rated in history"))
+            continue
+        entry = stored[player]
+        if player not in replayed:
+            # Listed but never played is fine as long as it still has the starting rating
+            unplayed = {"mu": defaults["mu"], "sigma": defaults["sigma"], **STATS}
+            if any(_differs(v, unplayed[k], tolerance) for k, v in {**entry, **stats_of(entry)}.items() if k in unplayed):
+                problems.append((player, "entry", "rated", "not in history"))
+            continue
+        expected = replayed[player]
+        for field in ("mu", "sigma"):
+            if _differs(entry.get(field), expected[field], tolerance):
+                problems.append((player, field, entry.get(field), expected[field]))
+        actual = stats_of(entry)
+        for field in STATS:
+            if _differs(actual[field], expected[field], tolerance if field == "peak" else 0):
+                problems.append((player, field, actual[field], expected[field]))
+    return problems
+
+def audit(storage, games=None, workers=None, tolerance=TOLERANCE):
+    """{game: (problems, replayed leaderboard)} for every audited game."""
+    games = games or storage.list_games()
+
+    def load(game_name):
+        return storage.load_history(game_name), storage.load_leaderboard(game_name), game_params(game_name, storage)
+
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        loaded = dict(zip(games, pool.map(load, games)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        largest_first = sorted(games, key=lambda g: -len(loaded[g][0]))
+        futures = {g: pool.submit(_replay, (loaded[g][0], loaded[g][2])) for g in largest_first}
+        results = {}
+        for game_name in games:
+            _, stored, params = loaded[game_name]
+            replayed = futures[game_name].result()
+            results[game_name] = (compare(stored, replayed, params, tolerance), replayed)
+    return results
+
+def _show(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify leaderboards against their replayed history.")
+    parser.add_argument("games", nargs="*", help="games to audit (default: all)")
+    parser.add_argument("--repair", action="store_true", help="rewrite drifted leaderboards from history")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed difference in μ, σ and peak")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    storage = get_storage("local")
+    # A repair holds the lock so nobody records a match between the audit and the fix
+    with storage.transaction() if args.repair else contextlib.nullcontext():
+        results = audit(storage, args.games, args.workers, args.tolerance)
+        drifted = {g: replayed for g, (problems, replayed) in results.items() if problems}
+        for game_name, (problems, _) in results.items():
+            if not problems:
+                print(f"{game_name}: ok")
+                continue
+            print(f"{game_name}: {len(problems)} discrepancy(ies)")
+            for player, field, stored, expected in problems:
+                print(f"    {player:14} {field:12} stored {_show(stored)}, history {_show(expected)}")
+        if not drifted:
+            print(f"\nAll {len(results)} leaderboard(s) match their history.")
+            return
+        if not args.repair:
+            print(f"\n{len(drifted)} leaderboard(s) drifted; rerun with --repair to rebuild them from history.")
+            sys.exit(1)
+        files = {leaderboard_path(g): encode_leaderboard(replayed) for g, replayed in drifted.items()}
+        storage.write_files(files, f"Repair {', '.join(drifted)} leaderboard(s) from history")
+        print(f"\nRebuilt {len(drifted)} leaderboard(s) from history in one commit.")
+
+if __name__ == "__main__":
+    main()
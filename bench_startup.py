@@ -0,0 +1,111 @@
+"""
+Startup-time benchmark for the CLI and Streamlit entry points.
+
+    py bench_startup.py            # report and check against the budgets
+    py bench_startup.py --runs 10
+
+Each import is timed in a fresh interpreter. The run fails (exit code 1) if an
+import goes over its budget or drags in a heavy dependency that should only be
+loaded on demand, so it can be used as a regression guard.
+Streamlit pages are timed with streamlit's AppTest against the in-memory
+backend (no network) when streamlit is installed.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# module -> (budget in ms, modules that must NOT be imported as a side effect)
+IMPORT_BUDGETS = {
+    "storage": (150, ["requests", "trueskill", "matplotlib", "openpyxl", "streamlit"]),
+    "ratings": (150, ["trueskill"]),
+    "leaderboard": (200, ["requests", "trueskill", "matplotlib", "openpyxl"]),
+}
+
+PAGES = [
+    "leaderboard_web_app.py",
+    "leaderboard_viewer.py",
+    "pages/Leaderboard.py",
+    "pages/Match_History.py",
+    "pages/Play_A_Game.py",
+    "pages/Player_Manager.py",
+    "pages/Season_Simulator.py",
+    "pages/Import_Matches.py",
+    "pages/Global_Ranking.py",
+]
+PAGE_BUDGET_MS = 3000
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def time_import(module, runs):
+    env = dict(os.environ, LEADERBOARD_BACKEND="memory")
+    timings, modules = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        modules.update(result["modules"])
+    return statistics.median(timings), modules
+
+def time_page(path):
+    from streamlit.testing.v1 import AppTest
+    os.environ["LEADERBOARD_BACKEND"] = "memory"
+    start = time.perf_counter()
+    AppTest.from_file(os.path.join(BASE_DIR, path), default_timeout=PAGE_BUDGET_MS / 1000).run()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    print("=== Import time (median of fresh interpreters) ===")
+    for module, (budget, forbidden) in IMPORT_BUDGETS.items():
+        ms, loaded = time_import(module, args.runs)
+        leaked = [m for m in forbidden if m in loaded]
+        status = "ok"
+        if ms > budget:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {ms:.1f} ms > {budget} ms")
+        if leaked:
+            status = "HEAVY IMPORT"
+            failures.append(f"{module}: imports {', '.join(leaked)} at import time")
+        print(f"{module:15} {ms:8.1f} ms  (budget {budget} ms)  {status}")
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("\nstreamlit not installed, skipping page timings.")
+    else:
+        print("\n=== Streamlit page first run (in-memory backend) ===")
+        for path in PAGES:
+            ms = time_page(path)
+            status = "ok" if ms <= PAGE_BUDGET_MS else "OVER BUDGET"
+            if ms > PAGE_BUDGET_MS:
+                failures.append(f"{path}: {ms:.0f} ms > {PAGE_BUDGET_MS} ms")
+            print(f"{path:28} {ms:8.1f} ms  {status}")
+
+    if failures:
+        print("\nStartup regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll startup budgets met.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Live change feed: events for recorded matches, undos and resets.
+
+api_server.py turns every new version of a game into an event,
+
+    {"id": 17, "game": "scythe", "kind": "match" | "undo" | "reset" | "update",
+     "version": "...", "total": 42, "matches": [new matches with "number"],
+     "deltas": {player: {"mu", "sigma", "wins", "d_mu", "d_sigma", "d_rating"} or null}}
+
+and streams them as server-sent events on /events (?game= to filter,
+Last-Event-ID to resume). /version is the cheap polling fallback.
+
+Writers tell the server about their writes when LEADERBOARD_API_URL is set
+(get_storage() installs install_notifier), so events go out right away instead
+of at the server's next refresh. The notification carries LEADERBOARD_API_SECRET
+in the X-Leaderboard-Secret header; without a secret the server only accepts it
+from its own machine. live_leaderboard() is the Streamlit component
+that listens to the feed and patches its table in place.
+"""
+import hashlib
+import json
+import os
+import threading
+import urllib.request
+from urllib.parse import quote
+
+from ratings import conservative
+from storage import encode_json, encode_leaderboard, games_in_paths
+
+POLL_SECONDS = 5
+SECRET_HEADER = "X-Leaderboard-Secret"
+
+def api_secret():
+    """LEADERBOARD_API_SECRET, shared by api_server.py and the writers that notify it; "" if unset."""
+    return os.getenv("LEADERBOARD_API_SECRET", "").strip()
+
+# ---- Events ----
+def rating_deltas(old, new):
+    """{player: new values and changes} for every player whose entry changed; None if removed."""
+    deltas = {}
+    for player in set(old) | set(new):
+        before, after = old.get(player), new.get(player)
+        if before == after:
+            continue
+        if after is None:
+            deltas[player] = None
+            continue
+        before = before or {"mu": after["mu"], "sigma": after["sigma"], "wins": 0}
+        deltas[player] = {
+            "mu": after["mu"],
+            "sigma": after["sigma"],
+            "wins": after.get("wins", 0),
+            "d_mu": after["mu"] - before["mu"],
+            "d_sigma": after["sigma"] - before["sigma"],
+            "d_rating": conservative(after["mu"], after["sigma"]) - conservative(before["mu"], before["sigma"]),
+        }
+    return deltas
+
+def _all_reset(leaderboard):
+    return len(leaderboard) > 1 and len({(r["mu"], r["sigma"]) for r in leaderboard.values()}) == 1
+
+def change_event(game_name, old_leaderboard, old_total, new_leaderboard, new_total, recent, version):
+    """Describe the step from one version of a game to the next; `recent` is the new newest matches."""
+    if new_total > old_total:
+        kind = "match"
+    elif new_total < old_total:
+        kind = "reset" if new_total == 0 else "undo"
+    else:
+        # An admin reset puts every player back on one common rating
+        kind = "reset" if _all_reset(new_leaderboard) and not _all_reset(old_leaderboard) else "update"
+    added = min(max(new_total - old_total, 0), len(recent))
+    first_number = new_total - added + 1
+    return {
+        "game": game_name,
+        "kind": kind,
+        "version": version,
+        "total": new_total,
+        "matches": [{"number": first_number + i, **m} for i, m in enumerate(recent[len(recent) - added:])],
+        "deltas": rating_deltas(old_leaderboard, new_leaderboard),
+    }
+
+def game_version(leaderboard, index, total):
+    """The version api_server.py reports for a game (its /version and events carry it)."""
+    digest = hashlib.sha1(encode_leaderboard(leaderboard))
+    digest.update(encode_json(index or {"count": total}))
+    return digest.hexdigest()[:16]
+
+def storage_version(storage, game_name, leaderboard):
+    """game_version of a game as stored, for a leaderboard just read from `storage`."""
+    index = storage.load_shard_index(game_name)
+    total = None if index is not None else len(storage.load_history(game_name))
+    return game_version(leaderboard, index, total)
+
+def format_sse(event):
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: change\ndata: {data}\n\n".encode("utf-8")
+
+# ---- Writers: tell the API server what changed ----
+def install_notifier(storage, api_url):
+    """After each write, POST /games/{game}/changed to the API server (in the background)."""
+    api_url = api_url.rstrip("/")
+    headers = {SECRET_HEADER: api_secret()} if api_secret() else {}
+
+    def notify(games):
+        for game_name in games:
+            request = urllib.request.Request(
+                f"{api_url}/games/{quote(game_name)}/changed", data=b"", headers=headers, method="POST"
+            )
+            try:
+                urllib.request.urlopen(request, timeout=2).close()
+            except OSError:
+                pass  # the server picks the change up at its next refresh anyway
+
+    def on_write(storage, paths, commit_message):
+        games = games_in_paths(paths)
+        if games:
+            threading.Thread(target=notify, args=(games,), daemon=True).start()
+
+    storage.add_listener(on_write)
+
+# ---- Streamlit component ----
+_COMPONENT = """
+<style>
+  body { font-family: "Source Sans Pro", sans-serif; margin: 0; }
+  table { border-collapse: collapse; width: 100%; font-size: 15px; }
+  th, td { border-bottom: 1px solid #e6e6e6; padding: 6px 8px; text-align: left; }
+  tr.changed td { animation: flash 2s ease-out; }
+  @keyframes flash { from { background: #fff3b0; } to { background: transparent; } }
+  .up { color: #1a7f37; } .down { color: #cf222e; }
+  #status { color: #888; font-size: 12px; margin-top: 4px; }
+</style>
+<table><thead><tr><th>Rank</th><th>Player</th><th>Skill (μ ± σ)</th><th>Rating</th><th>Wins</th></tr></thead>
+<tbody id="rows"></tbody></table>
+<div id="status"></div>
+<script>
+const API = __API__, GAME = __GAME__, POLL_MS = __POLL_MS__;
+let version = __VERSION__;
+let rows = new Map(__ROWS__.map(r => [r.player, r]));
+let changed = new Map();
+const esc = s => String(s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+
+function render() {
+  const sorted = [...rows.values()].sort((a, b) => (b.mu - 3 * b.sigma) - (a.mu - 3 * a.sigma));
+  document.getElementById("rows").innerHTML = sorted.map((r, i) => {
+    const d = changed.get(r.player);
+    const arrow = d ? `<span class="${d > 0 ? "up" : "down"}"> ${d > 0 ? "▲" : "▼"}${Math.abs(d).toFixed(2)}</span>` : "";
+    return `<tr class="${d !== undefined ? "changed" : ""}"><td>${i + 1}</td><td>${esc(r.player)}</td>` +
+           `<td>${r.mu.toFixed(2)} ± ${r.sigma.toFixed(2)}</td><td>${(r.mu - 3 * r.sigma).toFixed(2)}${arrow}</td><td>${r.wins}</td></tr>`;
+  }).join("");
+}
+
+function apply(event) {
+  if (event.game !== GAME) return;
+  changed = new Map();
+  for (const [player, d] of Object.entries(event.deltas)) {
+    if (d === null) { rows.delete(player); continue; }
+    rows.set(player, {player, mu: d.mu, sigma: d.sigma, wins: d.wins});
+    changed.set(player, d.d_rating);
+  }
+  version = event.version;
+  render();
+  document.getElementById("status").textContent = "Live · updated " + new Date().toLocaleTimeString();
+}
+
+let polling = null;
+function startPolling() {
+  if (polling) return;
+  document.getElementById("status").textContent = "Checking for updates every " + POLL_MS / 1000 + "s";
+  polling = setInterval(async () => {
+    try {
+      const latest = (await (await fetch(API + "/version")).json()).games[GAME];
+      if (!latest || latest === version) return;
+      const board = await (await fetch(API + "/games/" + encodeURIComponent(GAME) + "/leaderboard")).json();
+      const old = rows;
+      rows = new Map(board.players.map(r => [r.player, r]));
+      changed = new Map([...rows.values()]
+        .filter(r => !old.has(r.player) || old.get(r.player).mu !== r.mu)
+        .map(r => [r.player, (r.mu - 3 * r.sigma) - (old.has(r.player) ? old.get(r.player).mu - 3 * old.get(r.player).sigma : 0)]));
+      version = board.version;
+      render();
+    } catch (e) { /* server unreachable: try again next tick */ }
+  }, POLL_MS);
+}
+
+render();
+if (window.EventSource) {
+  const source = new EventSource(API + "/events?game=" + encodeURIComponent(GAME));
+  source.addEventListener("change", e => apply(JSON.parse(e.data)));
+  source.onopen = () => { document.getElementById("status").textContent = "Live"; };
+  source.onerror = () => { if (source.readyState === EventSource.CLOSED) startPolling(); };
+  setTimeout(() => { if (source.readyState !== EventSource.OPEN) { source.close(); startPolling(); } }, 5000);
+} else {
+  startPolling();
+}
+</script>
+"""
+
+def _script_value(value):
+    """`value` as a JavaScript literal that cannot close the surrounding <script>."""
+    return json.dumps(value).replace("</", "<\\/").replace("<!--", "<\\!--")
+
+def live_leaderboard(api_url, game_name, leaderboard, version=None, height=None):
+    """
+    Render a leaderboard table that follows the change feed of `api_url` in the
+    browser. `version` is the game_version the leaderboard was read at; it tells
+    the component which updates it already shows.
+    """
+    import streamlit.components.v1 as components
+    rows = [{"player": p, "mu": r["mu"], "sigma": r["sigma"], "wins": r.get("wins", 0)} for p, r in leaderboard.items()]
+    html = (
+        _COMPONENT
+        .replace("__API__", _script_value(api_url.rstrip("/")))
+        .replace("__GAME__", _script_value(game_name))
+        .replace("__POLL_MS__", str(int(POLL_SECONDS * 1000)))
+        .replace("__VERSION__", _script_value(version))
+        .replace("__ROWS__", _script_value(rows))
+    )
+    components.html(html, height=height or 80 + 37 * max(len(rows), 1), scrolling=True)
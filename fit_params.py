@@ -0,0 +1,133 @@
+"""
+Fit TrueSkill parameters per game by replaying its recorded history.
+
+    py fit_params.py                  # fit every game and print the results
+    py fit_params.py scythe unfair    # only these games
+    py fit_params.py --apply          # also store them and rebuild the leaderboards
+
+Every candidate (σ₀, β, τ) is scored by the predictive log-likelihood of the
+actual results: before each match is rated, the probability that every team
+finished ahead of the next one is computed from the current ratings.
+Candidates run in parallel on a process pool and are pruned by successive
+halving (scored on the first quarter of the history, then half, then all),
+so hopeless settings stop early. --apply writes leaderboards/trueskill_params.json
+and the leaderboards rebuilt under the new parameters in one commit.
+"""
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ratings import DEFAULT_PARAMS, make_env, rate_match, replay
+from storage import get_storage, leaderboard_path, encode_leaderboard
+
+MIN_MATCHES = 10
+ROUNDS = (0.25, 0.5, 1.0)
+SIGMA_FACTORS = (0.5, 0.75, 1.0, 1.5)
+BETA_FACTORS = (0.5, 1.0, 1.5, 2.0, 3.0)
+TAU_FACTORS = (0.0, 1.0, 3.0, 10.0)
+
+def candidate_grid():
+    base = DEFAULT_PARAMS
+    return [
+        {**base, "sigma": base["sigma"] * s, "beta": base["beta"] * b, "tau": base["tau"] * t}
+        for s in SIGMA_FACTORS for b in BETA_FACTORS for t in TAU_FACTORS
+    ]
+
+def log_likelihood(matches, params):
+    """(total log-likelihood, number of scored finishing pairs) of `matches` under `params`."""
+    env = make_env(params)
+    beta_sq = params["beta"] ** 2
+    leaderboard = {}
+    total, pairs = 0.0, 0
+    for match in matches:
+        teams, ranks = match["teams"], match["ranks"]
+        for team in teams:
+            for player in team:
+                if player not in leaderboard:
+                    leaderboard[player] = {"mu": params["mu"], "sigma": params["sigma"], "wins": 0}
+        order = sorted(range(len(teams)), key=lambda i: ranks[i])
+        for a, b in zip(order, order[1:]):
+            if ranks[a] == ranks[b]:
+                continue
+            ahead, behind = teams[a], teams[b]
+            delta = sum(leaderboard[p]["mu"] for p in ahead) - sum(leaderboard[p]["mu"] for p in behind)
+            variance = (len(ahead) + len(behind)) * beta_sq + sum(leaderboard[p]["sigma"] ** 2 for p in ahead + behind)
+            total += math.log(max(env.cdf(delta / math.sqrt(variance)), 1e-12))
+            pairs += 1
+        rate_match(leaderboard, match, env)
+    return total, pairs
+
+# ---- Process pool plumbing: histories are sent to each worker once ----
+_histories = {}
+
+def _init_worker(histories):
+    _histories.update(histories)
+
+def _score(task):
+    game_name, length, params = task
+    return log_likelihood(_histories[game_name][:length], params)[0]
+
+def fit_game(pool, game_name, matches):
+    """Best parameters for one game, or None if its history is too short to fit."""
+    if len(matches) < MIN_MATCHES:
+        return None
+    candidates = candidate_grid()
+    for fraction in ROUNDS:
+        length = max(MIN_MATCHES, math.ceil(len(matches) * fraction))
+        scores = list(pool.map(_score, [(game_name, length, c) for c in candidates]))
+        ranked = sorted(zip(scores, range(len(candidates))), reverse=True)
+        if fraction < 1.0:
+            candidates = [candidates[i] for _, i in ranked[: max(1, len(ranked) // 2)]]
+    best_score, best = ranked[0][0], candidates[ranked[0][1]]
+    baseline, pairs = log_likelihood(matches, DEFAULT_PARAMS)
+    if baseline >= best_score:
+        best, best_score = dict(DEFAULT_PARAMS), baseline
+    pairs = max(pairs, 1)
+    return {
+        **{key: best[key] for key in DEFAULT_PARAMS},
+        "log_likelihood": best_score / pairs,
+        "baseline_log_likelihood": baseline / pairs,
+        "matches": len(matches),
+        "fitted_at": datetime.utcnow().isoformat(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit per-game TrueSkill parameters from history.")
+    parser.add_argument("games", nargs="*", help="games to fit (default: all)")
+    parser.add_argument("--apply", action="store_true", help="store the parameters and rebuild leaderboards")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    storage = get_storage("local")
+    games = args.games or storage.list_games()
+    histories = {g: storage.load_history(g) for g in games}
+
+    fitted = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(histories,)) as pool:
+        for game_name in games:
+            result = fit_game(pool, game_name, histories[game_name])
+            if result is None:
+                print(f"{game_name}: only {len(histories[game_name])} matches, keeping defaults (need {MIN_MATCHES}).")
+                continue
+            fitted[game_name] = result
+            print(
+                f"{game_name}: σ₀={result['sigma']:.2f} β={result['beta']:.2f} τ={result['tau']:.3f} | "
+                f"log-likelihood per result {result['log_likelihood']:.4f} "
+                f"(defaults {result['baseline_log_likelihood']:.4f})"
+            )
+
+    if not args.apply or not fitted:
+        return
+    # Matches recorded while fitting must be in the rebuilt leaderboards: reload under the lock
+    with storage.transaction():
+        params = {**storage.load_trueskill_params(), **fitted}
+        files = storage.trueskill_params_file(params)
+        for game_name, game_params in fitted.items():
+            matches = storage.load_history(game_name)
+            files[leaderboard_path(game_name)] = encode_leaderboard(replay(matches, make_env(game_params)))
+        storage.write_files(files, f"Fit TrueSkill parameters for {', '.join(fitted)}")
+    print(f"\nStored parameters and rebuilt {len(fitted)} leaderboard(s) in one commit.")
+
+if __name__ == "__main__":
+    main()
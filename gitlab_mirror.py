@@ -0,0 +1,187 @@
+"""
+On-disk mirror of the GitLab leaderboards/ folder, kept current by delta sync.
+
+Without it every process (each Streamlit worker, every CLI run) downloads each
+file it reads from GitLab. The mirror keeps the folder on disk together with
+the commit SHA it matches (mirror.json). To sync, it asks GitLab for the
+branch head. If the head equals the mirrored SHA nothing else happens, so a
+warm start costs one request. Otherwise the compare API lists the files that
+changed in between, and only those are downloaded, at the head commit so the
+mirror always matches one commit. When GitLab cannot give a complete compare
+(unknown commit after a force push, timeout, capped diff) the mirror falls
+back to a full download.
+
+The head is checked at most every GITLAB_MIRROR_MAX_AGE seconds, plus at the
+start of every read-modify-write (see GitLabStorage.transaction). Writes are
+committed to GitLab first and then applied to the mirror. If nobody else
+committed in between, the mirror moves straight to the new commit. Processes
+on one machine share a mirror; a file lock serializes their syncs.
+
+A mirror covers one league: its folder plus any shared files (leagues.json),
+with the other leagues' folders excluded from the default league's. Syncing
+one league never downloads another league's files.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import GitLab_Persistence as gitlab
+from file_lock import FileLock, atomic_write, fsync_dir, remove
+
+MIRRORED = "leaderboards"
+STATE_FILE = "mirror.json"
+MAX_AGE = float(os.getenv("GITLAB_MIRROR_MAX_AGE", "5"))
+FETCH_WORKERS = 8
+
+def default_directory(base_dir):
+    """GITLAB_MIRROR_DIR, or .gitlab_mirror/ next to the code; None when set to "off"."""
+    directory = os.getenv("GITLAB_MIRROR_DIR", "").strip()
+    if directory.lower() == "off":
+        return None
+    return directory or os.path.join(base_dir, ".gitlab_mirror")
+
+
+class GitLabMirror:
+    def __init__(self, directory, root=MIRRORED, shared=(), excluded=(), max_age=MAX_AGE):
+        self.root = root              # folder mirrored recursively
+        self.shared = set(shared)     # single files outside it that are mirrored too
+        self.excluded = tuple(p.rstrip("/") + "/" for p in excluded)
+        # One subfolder per server, project, branch and scope, so a mirror never mixes them
+        key = f"{gitlab.GITLAB_API_BASE}|{gitlab.GITLAB_PROJECT_ID}|{gitlab.BRANCH}|{root}"
+        self.directory = os.path.join(directory, hashlib.sha1(key.encode("utf-8")).hexdigest()[:12])
+        self.max_age = max_age
+        self._lock = FileLock(os.path.join(self.directory, ".lock"))
+        self._thread_lock = threading.Lock()
+        self._sha = None        # commit this process last saw the mirror at
+        self._checked = None    # time.monotonic() of the last head check
+
+    def _full_path(self, path):
+        return os.path.join(self.directory, *path.split("/"))
+
+    def covers(self, path):
+        """Whether `path` belongs to this mirror's scope."""
+        if path in self.shared:
+            return True
+        return path.startswith(self.root + "/") and not path.startswith(self.excluded)
+
+    def _read_state(self):
+        try:
+            with open(os.path.join(self.directory, STATE_FILE), "rb") as f:
+                return json.loads(f.read()).get("sha")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_state(self, sha):
+        atomic_write(os.path.join(self.directory, STATE_FILE), json.dumps({"sha": sha}).encode("ascii"))
+        self._sha = sha
+
+    # ---- Reads ----
+    def read_bytes(self, path):
+        self.refresh()
+        try:
+            with open(self._full_path(path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list_dir(self, directory):
+        self.refresh()
+        full_path = self._full_path(directory)
+        if not os.path.isdir(full_path):
+            return []
+        return [
+            n for n in os.listdir(full_path)
+            if os.path.isfile(os.path.join(full_path, n)) and not n.startswith(".") and not n.endswith(".tmp")
+        ]
+
+    def exists(self, path):
+        return os.path.isfile(self._full_path(path))
+
+    # ---- Sync ----
+    def refresh(self, force=False):
+        """Bring the mirror to the branch head if it was not checked in the last max_age seconds."""
+        with self._thread_lock:
+            now = time.monotonic()
+            if not force and self._checked is not None and now - self._checked < self.max_age:
+                return
+            head = gitlab.gitlab_head_sha()
+            self._checked = now
+            if head is not None and head == self._sha:
+                return
+            self.sync(head)
+
+    def sync(self, head):
+        with self._lock:
+            mirrored = self._read_state()
+            if mirrored == head:
+                self._sha = head
+                return
+            changes = gitlab.gitlab_compare(mirrored, head) if mirrored and head else None
+            if changes is None:
+                self._download_all(head)
+            else:
+                self._download({p: d for p, d in changes.items() if self.covers(p)}, head)
+            self._write_state(head)
+
+    def _download(self, changes, ref):
+        """Apply {path: deleted?}, fetching the changed files at `ref` in parallel."""
+        fetch = [p for p, deleted in changes.items() if not deleted]
+
+        def get(path):
+            status, content = gitlab.gitlab_raw_get_bytes(path, ref=ref)
+            if status not in (200, 404):
+                raise RuntimeError(f"GitLab API error {status} reading {path}")
+            return content if status == 200 else None
+
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            contents = dict(zip(fetch, pool.map(get, fetch)))
+        self._apply({p: contents.get(p) for p in changes})
+
+    def _download_all(self, head):
+        present = {p for p in self.shared if self.exists(p)}
+        for root, _, names in os.walk(self._full_path(self.root)):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    relative = os.path.relpath(os.path.join(root, name), self.directory)
+                    present.add(relative.replace(os.sep, "/"))
+        upstream = set()
+        if head:
+            # Shared files are fetched by name; a 404 just means they do not exist yet
+            upstream = {p for p in gitlab.gitlab_list_files(self.root, ref=head) if self.covers(p)} | self.shared
+        present = {p for p in present if self.covers(p)}
+        self._download({**{p: True for p in present - upstream}, **{p: False for p in upstream}}, head)
+
+    def _apply(self, files):
+        """Write {path: bytes or None (delete)} into the mirror."""
+        directories = set()
+        for path, content in files.items():
+            full_path = self._full_path(path)
+            if content is None:
+                remove(full_path)
+            else:
+                atomic_write(full_path, content)
+            directories.add(os.path.dirname(full_path))
+        for directory in directories:
+            if os.path.isdir(directory):
+                fsync_dir(directory)
+
+    # ---- Writes ----
+    def commit(self, files, commit_message):
+        """Commit {path: bytes or None} to GitLab, then apply it to the mirror."""
+        with self._thread_lock, self._lock:
+            present = {p for p in files if self.exists(p)}
+            commit = gitlab.gitlab_commit_files(files, commit_message, present=present)
+            if commit is None:
+                return None
+            self._apply({p: content for p, content in files.items() if self.covers(p)})
+            parents = commit.get("parent_ids") or []
+            if parents and parents[0] == self._read_state():
+                # Nothing else landed in between: the mirror now matches the new commit
+                self._write_state(commit["id"])
+            else:
+                # Someone else committed too; the next check fetches their changes
+                self._checked = None
+            return commit
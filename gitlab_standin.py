@@ -0,0 +1,209 @@
+"""
+Local stand-in for the parts of the GitLab API this project uses.
+
+    py gitlab_standin.py --port 8929 --seed .    # serves a copy of ./leaderboards
+    set GITLAB_API_BASE=http://localhost:8929/api/v4
+    set GITLAB_PROJECT_ID=local
+
+Keeps a linear commit history in memory (nothing is written back to disk) and
+answers branches, compare, tree, raw file, file and commit requests for any
+project ID. GET /stats returns the number of requests per endpoint, which is
+how the mirror's "one request on a warm start" can be checked.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class Repository:
+    """Linear history: every commit is (sha, parent, message, {path: bytes})."""
+
+    def __init__(self, files=None, branch="main"):
+        self.branch = branch
+        self.commits = []
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        if files:
+            self.commit(files, "Initial import")
+
+    def head(self):
+        return self.commits[-1] if self.commits else None
+
+    def tree(self, ref):
+        """{path: bytes} at a branch name or commit SHA, or None if unknown."""
+        if ref == self.branch:
+            head = self.head()
+            return head[3] if head else None
+        for commit in self.commits:
+            if commit[0] == ref:
+                return commit[3]
+        return None
+
+    def commit(self, changes, message):
+        """Apply {path: bytes or None}; returns the new commit."""
+        with self.lock:
+            head = self.head()
+            files = dict(head[3]) if head else {}
+            for path, content in changes.items():
+                if content is None:
+                    files.pop(path, None)
+                else:
+                    files[path] = content
+            parent = head[0] if head else ""
+            sha = hashlib.sha1(f"{parent}\n{message}\n{len(self.commits)}".encode("utf-8")).hexdigest()
+            self.commits.append((sha, parent, message, files))
+            return self.commits[-1]
+
+def load_seed(root):
+    """{path: bytes} of every file under <root>/leaderboards."""
+    files = {}
+    for directory, _, names in os.walk(os.path.join(root, "leaderboards")):
+        for name in names:
+            if name.startswith(".") or name.endswith(".tmp"):
+                continue
+            full_path = os.path.join(directory, name)
+            with open(full_path, "rb") as f:
+                files[os.path.relpath(full_path, root).replace(os.sep, "/")] = f.read()
+    return files
+
+
+class Handler(BaseHTTPRequestHandler):
+    repo = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        """(endpoint, rest of the repository path, query) for /api/v4/projects/<id>/repository/..."""
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        segments = parts.path.split("/")
+        if parts.path == "/stats":
+            return "stats", "", query
+        if len(segments) < 6 or segments[1:4] != ["api", "v4", "projects"] or segments[5] != "repository":
+            return None, "", query
+        return segments[6] if len(segments) > 6 else "", "/".join(segments[7:]), query
+
+    def do_GET(self):
+        endpoint, rest, query = self._route()
+        repo = self.repo
+        repo.stats[f"GET {endpoint}"] += 1
+        if endpoint == "stats":
+            return self._send(200, dict(repo.stats))
+        if endpoint == "branches":
+            head = repo.head()
+            if unquote(rest) != repo.branch or head is None:
+                return self._send(404, {"message": "404 Branch Not Found"})
+            return self._send(200, {"name": repo.branch, "commit": {"id": head[0], "parent_ids": [head[1]]}})
+        if endpoint == "compare":
+            old, new = repo.tree(query.get("from")), repo.tree(query.get("to"))
+            if old is None or new is None:
+                return self._send(404, {"message": "404 Not found"})
+            diffs = [
+                {"old_path": p, "new_path": p, "new_file": p not in old, "deleted_file": p not in new, "renamed_file": False}
+                for p in sorted(set(old) | set(new)) if old.get(p) != new.get(p)
+            ]
+            return self._send(200, {"commits": [], "diffs": diffs, "compare_timeout": False})
+        if endpoint == "tree":
+            files = repo.tree(query.get("ref", repo.branch)) or {}
+            path = query.get("path", "").strip("/")
+            prefix = f"{path}/" if path else ""
+            if query.get("recursive") == "true":
+                names = sorted(p for p in files if p.startswith(prefix))
+            else:
+                names = sorted(p for p in files if p.startswith(prefix) and "/" not in p[len(prefix):])
+            per_page, page = int(query.get("per_page", 20)), int(query.get("page", 1))
+            entries = [{"name": p.rsplit("/", 1)[-1], "path": p, "type": "blob"} for p in names]
+            return self._send(200, entries[(page - 1) * per_page:page * per_page])
+        if endpoint == "files":
+            raw = rest.endswith("/raw")
+            path = unquote(rest[: -len("/raw")] if raw else rest)
+            files = repo.tree(query.get("ref", repo.branch)) or {}
+            if path not in files:
+                return self._send(404, {"message": "404 File Not Found"})
+            if raw:
+                return self._send(200, files[path], "application/octet-stream")
+            return self._send(200, {"file_path": path, "size": len(files[path])})
+        return self._send(404, {"message": "404 Not Found"})
+
+    def _payload(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    @staticmethod
+    def _content(item):
+        if item.get("encoding") == "base64":
+            return base64.b64decode(item["content"])
+        return item["content"].encode("utf-8")
+
+    def do_POST(self):
+        endpoint, rest, _ = self._route()
+        repo = self.repo
+        repo.stats[f"POST {endpoint}"] += 1
+        payload = self._payload()
+        files = repo.tree(repo.branch) or {}
+        if endpoint == "commits":
+            changes = {}
+            for action in payload.get("actions", []):
+                path, kind = action["file_path"], action["action"]
+                if (kind == "create") == (path in files):
+                    return self._send(400, {"message": f"A file with this name {'already exists' if kind == 'create' else 'does not exist'}"})
+                changes[path] = None if kind == "delete" else self._content(action)
+            commit = repo.commit(changes, payload.get("commit_message", ""))
+            return self._send(201, {"id": commit[0], "parent_ids": [commit[1]] if commit[1] else []})
+        if endpoint == "files":
+            path = unquote(rest)
+            if path in files:
+                return self._send(400, {"message": "A file with this name already exists"})
+            repo.commit({path: self._content(payload)}, payload.get("commit_message", ""))
+            return self._send(201, {"file_path": path, "branch": repo.branch})
+        return self._send(404, {"message": "404 Not Found"})
+
+    def do_PUT(self):
+        endpoint, rest, _ = self._route()
+        self.repo.stats[f"PUT {endpoint}"] += 1
+        path = unquote(rest)
+        if endpoint != "files" or path not in (self.repo.tree(self.repo.branch) or {}):
+            return self._send(400, {"message": "A file with this name doesn't exist"})
+        payload = self._payload()
+        self.repo.commit({path: self._content(payload)}, payload.get("commit_message", ""))
+        return self._send(200, {"file_path": path, "branch": self.repo.branch})
+
+def make_server(repo, host="127.0.0.1", port=8929):
+    return ThreadingHTTPServer((host, port), type("RepositoryHandler", (Handler,), {"repo": repo}))
+
+def serve(repo, host="127.0.0.1", port=8929):
+    """Start the stand-in in a background thread; returns the server (call shutdown() to stop)."""
+    server = make_server(repo, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the GitLab API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8929)
+    parser.add_argument("--seed", metavar="DIR", help="start from a copy of DIR/leaderboards")
+    parser.add_argument("--branch", default=os.getenv("GITLAB_BRANCH", "main"))
+    args = parser.parse_args()
+
+    repo = Repository(load_seed(args.seed) if args.seed else None, branch=args.branch)
+    server = make_server(repo, args.host, args.port)
+    print(f"GitLab stand-in on http://{args.host}:{args.port}/api/v4 ({len(repo.tree(repo.branch) or {})} files)")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,32 @@
-import requests
 import streamlit as st
-import base64
 
-# ---- Load secrets ----
-GITLAB_TOKEN = st.secrets["GITLAB_TOKEN"]
-GITLAB_REPO = st.secrets["GITLAB_REPO"]
-GITLAB_BRANCH = st.secrets.get("GITLAB_BRANCH", "main")
+# All GitLab traffic goes through GitLab_Persistence; this module only
+# points it at the project configured in Streamlit secrets.
+_client = None
 
-API_BASE = "https://gitlab.com/api/v4"
+def _gitlab():
+    """Read secrets and configure the client on first use, not at import."""
+    global _client
+    if _client is None:
+        import GitLab_Persistence
+        GitLab_Persistence.configure(
+            project_id=st.secrets["GITLAB_REPO"],
+            token=st.secrets["GITLAB_TOKEN"],
+            branch=st.secrets.get("GITLAB_BRANCH", "main"),
+        )
+        _client = GitLab_Persistence
+    return _client
 
 def update_file_in_gitlab(file_path: str, content: str, commit_message: str):
     """
     Create or update a file in GitLab.
     """
-    url = f"{API_BASE}/projects/{requests.utils.quote(GITLAB_REPO, safe='')}/repository/files/{requests.utils.quote(file_path, safe='')}"
-    
-    headers = {"PRIVATE-TOKEN": GITLAB_TOKEN}
-    data = {
-        "branch": GITLAB_BRANCH,
-        "content": content,
-        "commit_message": commit_message,
-    }
-
-    # Try to update
-    r = requests.put(url, headers=headers, data=data)
-    if r.status_code == 200:
+    try:
+        _gitlab().gitlab_commit_files({file_path: content}, commit_message)
         return True
-    if r.status_code == 404:
-        # File does not exist, create it
-        r = requests.post(url, headers=headers, data=data)
-        return r.status_code == 201
-
-    st.error(f"GitLab update failed: {r.status_code}, {r.text}")
-    return False
+    except RuntimeError as e:
+        st.error(f"GitLab update failed: {e}")
+        return False
 
 
 def get_file_from_gitlab(file_path: str):
@@ -40,17 +34,11 @@ def get_file_from_gitlab(file_path: str):
     Get a file's content from GitLab as a string.
     Returns None if file doesn't exist or fails.
     """
-    url = f"{API_BASE}/projects/{requests.utils.quote(GITLAB_REPO, safe='')}/repository/files/{requests.utils.quote(file_path, safe='')}?ref={GITLAB_BRANCH}"
-    headers = {"PRIVATE-TOKEN": GITLAB_TOKEN}
-    r = requests.get(url, headers=headers)
-    if r.status_code == 200:
-        file_info = r.json()
-        encoded_content = file_info.get("content", "")
-        # Decode Base64
-        decoded_bytes = base64.b64decode(encoded_content)
-        return decoded_bytes.decode("utf-8")
-    elif r.status_code == 404:
+    status, content = _gitlab().gitlab_raw_get_bytes(file_path)
+    if status == 200:
+        return content.decode("utf-8")
+    elif status == 404:
         return None
     else:
-        st.error(f"Failed to fetch {file_path} from GitLab: {r.status_code}, {r.text}")
+        st.error(f"Failed to fetch {file_path} from GitLab: {status}")
         return None
@@ -0,0 +1,160 @@
+"""
+One "best overall player" board across every game of a league.
+
+    py global_ranking.py                          # show the board
+    py global_ranking.py --weight scythe=2 --activity 0.3 --save
+    py global_ranking.py --rebuild                # re-read every leaderboard once
+
+Each game is reduced to a small summary ({player: [conservative rating,
+played, wins]}) kept in leaderboards/game_summaries.json. Storage.write_files
+refreshes a game's summary in the same batch whenever its leaderboard is
+written, so the board costs one small read and never a fetch of every game.
+
+Scoring (the scheme is stored in the same file and can be changed):
+  * per game, a player's skill is their percentile among the game's players
+    ("percentile"), or their rating scaled to the game's min..max ("scaled");
+    games where they played fewer than min_played matches are skipped
+  * skill = mean of those, weighted by the game's weight and by confidence
+    (played / (played + CONFIDENCE_MATCHES))
+  * activity = weighted matches played, relative to the most active player
+  * score = (1 - activity) * skill + activity * activity share
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from ratings import conservative, stats_of
+
+DEFAULT_SCHEME = {
+    "mode": "percentile",   # or "scaled"
+    "activity": 0.2,        # share of the score that rewards playing a lot
+    "min_played": 3,        # matches a player needs in a game for it to count
+    "weights": {},          # game -> weight (default 1)
+}
+CONFIDENCE_MATCHES = 5
+READ_WORKERS = 8
+
+def game_summary(leaderboard):
+    """{"players": {player: [conservative rating, played, wins]}} of one game."""
+    players = {}
+    for player, entry in leaderboard.items():
+        stats = stats_of(entry)
+        players[player] = [round(conservative(entry["mu"], entry["sigma"]), 3), stats["played"], stats["wins"]]
+    return {"players": players}
+
+def build_summaries(storage, scheme=None):
+    """Summaries of every game, read in parallel (only needed once, or after --rebuild)."""
+    games = storage.list_games()
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        leaderboards = list(pool.map(storage.load_leaderboard, games))
+    return {
+        "scheme": scheme or dict(DEFAULT_SCHEME),
+        "games": {game: game_summary(lb) for game, lb in zip(games, leaderboards)},
+    }
+
+def load_summaries(storage):
+    """The stored summaries, building and writing them on first use."""
+    summaries = storage.load_summaries()
+    if summaries is None:
+        with storage.transaction():
+            summaries = storage.load_summaries()
+            if summaries is None:
+                summaries = build_summaries(storage)
+                storage.write_files(storage.summaries_file(summaries), "Build game summaries")
+    return summaries
+
+def save_scheme(storage, scheme):
+    with storage.transaction():
+        summaries = load_summaries(storage)
+        summaries["scheme"] = scheme
+        storage.write_files(storage.summaries_file(summaries), "Update global ranking scheme")
+
+def _game_skills(players, mode, min_played):
+    """{player: skill in 0..1} for the players with enough matches in one game."""
+    ratings = {p: v[0] for p, v in players.items() if v[1] >= min_played}
+    if not ratings:
+        return {}
+    if mode == "scaled":
+        low, high = min(ratings.values()), max(ratings.values())
+        return {p: (r - low) / (high - low) if high > low else 1.0 for p, r in ratings.items()}
+    ordered = sorted(ratings.values())
+    n = len(ordered)
+    # Share of the other players rated below (ties count half)
+    skills = {}
+    for player, rating in ratings.items():
+        below = sum(1 for r in ordered if r < rating)
+        equal = sum(1 for r in ordered if r == rating) - 1
+        skills[player] = (below + equal / 2) / (n - 1) if n > 1 else 1.0
+    return skills
+
+def rank_players(summaries, scheme=None):
+    """Ranked rows: {"rank", "player", "score", "skill", "activity", "games", "played", "wins"}."""
+    scheme = {**DEFAULT_SCHEME, **(scheme or summaries.get("scheme") or {})}
+    weights, share = scheme["weights"], scheme["activity"]
+    totals = {}  # player -> [weighted skill, skill weight, weighted matches, games, played, wins]
+    for game, summary in summaries["games"].items():
+        weight = weights.get(game, 1.0)
+        if weight <= 0:
+            continue
+        skills = _game_skills(summary["players"], scheme["mode"], scheme["min_played"])
+        for player, (_, played, wins) in summary["players"].items():
+            t = totals.setdefault(player, [0.0, 0.0, 0.0, 0, 0, 0])
+            if player in skills:
+                confidence = played / (played + CONFIDENCE_MATCHES)
+                t[0] += weight * confidence * skills[player]
+                t[1] += weight * confidence
+                t[3] += 1
+            t[2] += weight * played
+            t[4] += played
+            t[5] += wins
+    most_active = max((t[2] for t in totals.values()), default=0) or 1
+    rows = []
+    for player, (skill_sum, skill_weight, matches, games, played, wins) in totals.items():
+        if not games:
+            continue
+        skill = skill_sum / skill_weight
+        activity = matches / most_active
+        rows.append({
+            "player": player, "score": (1 - share) * skill + share * activity,
+            "skill": skill, "activity": activity, "games": games, "played": played, "wins": wins,
+        })
+    rows.sort(key=lambda r: r["score"], reverse=True)
+    for i, row in enumerate(rows, start=1):
+        row["rank"] = i
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-game ranking of every player in the league.")
+    parser.add_argument("--weight", action="append", default=[], metavar="GAME=W", help="weight of a game (default 1)")
+    parser.add_argument("--activity", type=float, help="share of the score from activity (0..1)")
+    parser.add_argument("--min-played", type=int, help="matches needed in a game for it to count")
+    parser.add_argument("--mode", choices=["percentile", "scaled"])
+    parser.add_argument("--save", action="store_true", help="store these options as the league's scheme")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild every game's summary")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    from storage import get_storage
+    storage = get_storage("local")
+    summaries = load_summaries(storage)
+    if args.rebuild:
+        with storage.transaction():
+            summaries = build_summaries(storage, summaries["scheme"])
+            storage.write_files(storage.summaries_file(summaries), "Rebuild game summaries")
+    scheme = {**DEFAULT_SCHEME, **summaries["scheme"]}
+    scheme["weights"] = dict(scheme["weights"])
+    for item in args.weight:
+        game, _, weight = item.partition("=")
+        scheme["weights"][game.strip().lower()] = float(weight)
+    for key, value in (("activity", args.activity), ("min_played", args.min_played), ("mode", args.mode)):
+        if value is not None:
+            scheme[key] = value
+    if args.save:
+        save_scheme(storage, scheme)
+
+    print(f"=== Global ranking ({len(summaries['games'])} games, {scheme['mode']}, activity {scheme['activity']:.0%}) ===")
+    for row in rank_players(summaries, scheme)[:args.top]:
+        print(f"{row['rank']:3}. {row['player']:14} score={row['score']:.3f} skill={row['skill']:.3f} "
+              f"games={row['games']} played={row['played']} wins={row['wins']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Byte layout of history shards and random access into them.
+
+A shard is compact JSON, {"schema_version":2,"matches":[m0,m1,...]}, written
+with exactly one byte (",") between matches. Next to it a sidecar
+"<shard>.idx" stores the shard's content hash followed by n+1 little-endian
+uint64 offsets: match i is content[off[i] : off[i+1] - 1]. With the sidecar a
+single match can be decoded straight from an mmap (local files) or from the
+downloaded bytes without parsing the others, and appends/undos splice bytes
+instead of re-encoding the shard.
+"""
+import bisect
+import json
+import sys
+from array import array
+from itertools import islice
+from schema import SCHEMA_VERSION
+
+HEADER = b'{"schema_version":%d,"matches":[' % SCHEMA_VERSION
+FOOTER = b"]}"
+SHA_LENGTH = 12
+
+def encode_match(match):
+    return json.dumps(match, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def encode_shard(matches):
+    """(content, offsets) for a list of matches."""
+    parts = [encode_match(m) for m in matches]
+    offsets = []
+    position = len(HEADER)
+    for part in parts:
+        offsets.append(position)
+        position += len(part) + 1
+    offsets.append(position if parts else position + 1)
+    return HEADER + b",".join(parts) + FOOTER, offsets
+
+def append_to_shard(content, offsets, match):
+    """Splice one match onto the end of a shard."""
+    part = encode_match(match)
+    end = offsets[-1] - 1  # position of the closing "]"
+    if len(offsets) == 1:
+        new_content = bytes(content[:end]) + part + FOOTER
+        return new_content, [end, end + len(part) + 1]
+    new_content = bytes(content[:end]) + b"," + part + FOOTER
+    return new_content, offsets + [end + 1 + len(part) + 1]
+
+def pop_from_shard(content, offsets):
+    """(content, offsets, match) with the newest match removed."""
+    match = json.loads(bytes(content[offsets[-2]:offsets[-1] - 1]))
+    if len(offsets) == 2:
+        return HEADER + FOOTER, [len(HEADER) + 1], match
+    cut = offsets[-2] - 1  # the "," before the last match
+    return bytes(content[:cut]) + FOOTER, offsets[:-1], match
+
+def encode_offsets(sha, offsets):
+    packed = array("Q", offsets)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return sha.encode("ascii") + packed.tobytes()
+
+def decode_offsets(raw, sha):
+    """Offsets from a sidecar, or None if it is missing or belongs to other content."""
+    if not raw or bytes(raw[:SHA_LENGTH]) != sha.encode("ascii"):
+        return None
+    offsets = array("Q")
+    offsets.frombytes(bytes(raw[SHA_LENGTH:]))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets
+
+
+class HistoryView:
+    """
+    Random access over a game's history: view[i], view[a:b], len(view),
+    view.newest_first(). Only the shards that are touched are opened, and only
+    the requested matches are decoded. Use as a context manager so mmaps are
+    released (Windows cannot replace a file while it is mapped).
+    """
+
+    def __init__(self, storage, game_name):
+        self.storage = storage
+        self.game_name = game_name
+        index = storage.load_shard_index(game_name)
+        if index is None:
+            self._shards = []
+            self._legacy = storage.load_history(game_name)
+            self._starts = [0, len(self._legacy)]
+        else:
+            self._shards = [s for s in index["shards"] if s["count"]]
+            self._legacy = None
+            self._starts = [0]
+            for shard in self._shards:
+                self._starts.append(self._starts[-1] + shard["count"])
+        self._opened = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for buffer, _, _ in self._opened.values():
+            if hasattr(buffer, "close"):
+                buffer.close()
+        self._opened.clear()
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def _open(self, k):
+        if k not in self._opened:
+            shard = self._shards[k]
+            buffer = self.storage.shard_buffer(self.game_name, shard)
+            offsets = self.storage.shard_offsets(self.game_name, shard)
+            parsed = None
+            if offsets is None or len(offsets) != shard["count"] + 1:
+                # No usable sidecar (e.g. written by an older version): parse the shard once
+                data = json.loads(bytes(buffer)) if len(buffer) else {}
+                parsed = data.get("matches", []) if isinstance(data, dict) else data
+            self._opened[k] = (buffer, offsets, parsed)
+        return self._opened[k]
+
+    def _get(self, i):
+        if self._legacy is not None:
+            return self._legacy[i]
+        k = bisect.bisect_right(self._starts, i) - 1
+        buffer, offsets, parsed = self._open(k)
+        j = i - self._starts[k]
+        if parsed is not None:
+            return parsed[j]
+        return json.loads(bytes(buffer[offsets[j]:offsets[j + 1] - 1]))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._get(i) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("match index out of range")
+        return self._get(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def newest_first(self, limit=None):
+        """Yield (match number starting at 1, match) from the newest match backwards."""
+        numbers = range(len(self), 0, -1)
+        for number in islice(numbers, limit):
+            yield number, self._get(number - 1)
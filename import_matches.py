@@ -0,0 +1,217 @@
+"""
+Bulk import of match results from CSV or JSONL.
+
+    py import_matches.py scythe results.csv
+    py import_matches.py scythe old_nights.jsonl --dry-run
+    py import_matches.py all_games.csv          # file has a "game" column
+
+Each row needs a timestamp ("timestamp" or "date") and a result, either in
+the CLI notation
+
+    result = "Alice,Bob=Charlie;Eve"   (";" between ranks, "=" between tied
+                                        teams, "," between team mates)
+
+or as structured "teams" / "ranks" (JSON lists in CSV, plain lists in JSONL;
+ranks in any numbering are stored as dense 0-based places). An optional "type" column is kept for display. Rows are validated, duplicates
+(same timestamp to the second and same participants, within the file or
+already in history) are skipped, and the rest is merged into the history in
+timestamp order. Each game is then replayed once and everything is written in
+a single batch / GitLab commit. When every imported match is newer than the
+stored history only the new matches are rated and appended; otherwise the
+history is rewritten from the first shard an imported match lands in.
+"""
+import argparse
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from ratings import get_env, rate_match, replay
+from storage import encode_leaderboard, get_storage, leaderboard_path
+
+# ---- Parsing ----
+def parse_result(text):
+    """(teams, ranks) from "Alice,Bob=Charlie,David;Eve,Frank"."""
+    teams, ranks = [], []
+    groups = [group.strip() for group in text.split(";") if group.strip()]
+    for rank, group in enumerate(groups):
+        for team in (t.strip() for t in group.split("=")):
+            players = [p.strip() for p in team.split(",") if p.strip()]
+            if players:
+                teams.append(players)
+                ranks.append(rank)
+    return teams, ranks
+
+def parse_timestamp(value):
+    value = str(value or "").strip()
+    if not value:
+        raise ValueError("missing timestamp")
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"unreadable timestamp {value!r}") from None
+    # Naive times are taken as UTC; aware ones are converted so different offsets sort correctly
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+def read_rows(data, filename=""):
+    """[(line number, row dict)] from CSV or JSONL bytes/str (JSONL if the name says so or it starts with "{")."""
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    if filename.lower().endswith((".jsonl", ".ndjson")) or text.lstrip().startswith("{"):
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                try:
+                    rows.append((number, json.loads(line)))
+                except ValueError as e:
+                    rows.append((number, {"_error": f"invalid JSON ({e})"}))
+        return rows
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    return [(number, row) for number, row in enumerate(reader, start=2)]
+
+def row_to_match(row):
+    """A validated teams/ranks match from one row; raises ValueError."""
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    timestamp = row.get("timestamp") or row.get("date")
+    parse_timestamp(timestamp)
+    result = row.get("result") or row.get("match")
+    if result:
+        if not isinstance(result, str):
+            raise ValueError("result must be text like \"Alice,Bob;Charlie\"")
+        teams, ranks = parse_result(result)
+    elif row.get("teams") is not None and row.get("ranks") is not None:
+        teams, ranks = row["teams"], row["ranks"]
+        if isinstance(teams, str):
+            teams, ranks = json.loads(teams), json.loads(ranks)
+        if not all(isinstance(t, list) and all(isinstance(p, str) and p.strip() for p in t) for t in teams):
+            raise ValueError("teams must be lists of player names")
+        teams = [[p.strip() for p in team] for team in teams]
+        if len(ranks) != len(teams) or not all(isinstance(r, int) and not isinstance(r, bool) for r in ranks):
+            raise ValueError("ranks must be one integer per team")
+        # Any numbering (1-based, sparse) is stored as dense 0-based places
+        places = sorted(set(ranks))
+        ranks = [places.index(r) for r in ranks]
+    else:
+        raise ValueError("no result (expected a 'result' column or 'teams' and 'ranks')")
+    if len(teams) < 2 or any(not team for team in teams):
+        raise ValueError("need at least 2 teams")
+    players = [p for team in teams for p in team]
+    if len(set(players)) != len(players):
+        raise ValueError("a player appears more than once")
+    match = {"teams": teams, "ranks": list(ranks), "timestamp": str(timestamp).strip()}
+    if row.get("type"):
+        match = {"type": row["type"], **match}
+    return match
+
+def rows_to_matches(rows, game_name=None):
+    """({game: [match, ...]}, [error message, ...]) from read_rows output."""
+    by_game, errors = {}, []
+    for number, row in rows:
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("expected an object with the match's columns")
+            game = row.get("game") or game_name or ""
+            if not isinstance(game, str):
+                raise ValueError("game must be text")
+            game = game.strip().lower()
+            if not game:
+                raise ValueError("no game (pass one or add a 'game' column)")
+            by_game.setdefault(game, []).append(row_to_match(row))
+        except (ValueError, TypeError) as e:
+            errors.append(f"line {number}: {e}")
+    return by_game, errors
+
+# ---- Merging ----
+def _moment(match):
+    try:
+        return parse_timestamp(match.get("timestamp"))
+    except ValueError:
+        return None
+
+def match_key(match, moment=None):
+    """Duplicate detection: timestamp to the second plus the set of participants."""
+    moment = moment or _moment(match)
+    when = moment.isoformat(timespec="seconds") if moment else match.get("timestamp")
+    return when, tuple(sorted(p for team in match["teams"] for p in team))
+
+def merge_matches(existing, incoming):
+    """(merged history, added, duplicates): incoming matches merged in timestamp order, duplicates skipped."""
+    seen, dated, latest = set(), [], datetime.min
+    for match in existing:
+        moment = _moment(match)
+        seen.add(match_key(match, moment))
+        # History keeps its order: an undated or out-of-order match sorts with
+        # the latest dated one before it, so only incoming matches move
+        latest = max(latest, moment or latest)
+        dated.append((latest, match))
+    added = []
+    for match in incoming:
+        moment = _moment(match)
+        key = match_key(match, moment)
+        if key not in seen:
+            seen.add(key)
+            added.append(match)
+            dated.append((moment or datetime.min, match))
+    # Stable sort: ties keep history order, incoming matches go after equal moments
+    dated.sort(key=lambda pair: pair[0])
+    return [m for _, m in dated], added, len(incoming) - len(added)
+
+def import_files(storage, by_game, dry_run=False):
+    """(files to write, {game: summary}) for importing {game: [match, ...]}."""
+    files, summary = {}, {}
+    for game_name, incoming in by_game.items():
+        existing = storage.load_history(game_name)
+        merged, added, duplicates = merge_matches(existing, incoming)
+        summary[game_name] = {"added": len(added), "duplicates": duplicates, "total": len(merged)}
+        if not added or dry_run:
+            continue
+        env = get_env(game_name, storage)
+        if merged[:len(existing)] == existing:
+            # Everything new is newer than the history: rate on top of the stored
+            # leaderboard and append, touching only the newest shard(s)
+            leaderboard = storage.load_leaderboard(game_name)
+            for match in merged[len(existing):]:
+                rate_match(leaderboard, match, env)
+            files.update(storage.append_files(game_name, merged[len(existing):]))
+        else:
+            leaderboard = replay(merged, env)
+            # Shards before the first imported match stay as they are
+            unchanged = next(i for i, (a, b) in enumerate(zip(merged, existing)) if a is not b)
+            files.update(storage.history_files(game_name, merged, unchanged))
+        files[leaderboard_path(game_name)] = encode_leaderboard(leaderboard)
+    return files, summary
+
+def import_matches(storage, by_game, dry_run=False):
+    """Import {game: [match, ...]} in one write; returns {game: summary}."""
+    with storage.transaction():
+        files, summary = import_files(storage, by_game, dry_run)
+        if files:
+            added = sum(s["added"] for s in summary.values())
+            storage.write_files(files, f"Import {added} match(es) into {', '.join(sorted(by_game))}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Import match results from CSV or JSONL.")
+    parser.add_argument("game", nargs="?", help="game to import into (omit if the file has a 'game' column)")
+    parser.add_argument("file")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report, write nothing")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        rows = read_rows(f.read(), args.file)
+    by_game, errors = rows_to_matches(rows, args.game)
+    for error in errors:
+        print(error)
+    if errors:
+        print(f"\n{len(errors)} invalid row(s); nothing imported.")
+        return
+
+    summary = import_matches(get_storage("local"), by_game, args.dry_run)
+    for game_name, s in summary.items():
+        print(f"{game_name}: {s['added']} new, {s['duplicates']} duplicate(s) skipped, {s['total']} matches in history")
+    if args.dry_run:
+        print("\nDry run: nothing written.")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,29 @@
-import json
 import os
 import csv
 from datetime import datetime
-import trueskill
-from openpyxl import Workbook
-import matplotlib.pyplot as plt
-from GitLab_Persistence import (
-    load_players_from_git,
-    save_players_to_git,
-    load_leaderboard_from_git,
-    save_leaderboard_to_git,
-    load_history_from_git,
-    save_history_to_git,
-    gitlab_list_leaderboards_dir,
-)
-
-# ---- Setup TrueSkill Environment ----
-env = trueskill.TrueSkill(draw_probability=0.0)
-
-# ---- Base directories for multi-game support ----
+from import_matches import parse_result
+from progression_chart import chart_data, default_players, draw
+from ratings import conservative
+from storage import get_storage
+
+# Heavy dependencies (trueskill, openpyxl, matplotlib) are imported inside the
+# functions that need them, and nothing below runs I/O or prompts at import
+# time, so this module can be imported cheaply by other code and tests.
+
+# ---- Storage backend (local files unless LEADERBOARD_BACKEND says otherwise) ----
+storage = get_storage("local")
+
+# ---- Base directory for exports ----
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LEADERBOARD_DIR = os.path.join(BASE_DIR, "leaderboards")
-os.makedirs(LEADERBOARD_DIR, exist_ok=True)
+
+# ---- Current game (chosen in main()) ----
+game_name = None
+leaderboard = {}
 
 # ---- Functions to handle multiple games ----
 def list_games():
-    existing_files = os.listdir(LEADERBOARD_DIR)
-    existing_games = sorted(list(set(f.split("_leaderboard.json")[0] for f in existing_files if f.endswith("_leaderboard.json"))))
-    return existing_games
+    return storage.list_games()
 
 def select_game_menu():
     existing_games = list_games()
@@ -50,72 +46,31 @@ def select_game_menu():
             print("Invalid choice, defaulting to new game.")
             game_name = input("Enter new game name: ").strip().lower()
 
-    save_file = os.path.join(LEADERBOARD_DIR, f"{game_name}_leaderboard.json")
-    history_file = os.path.join(LEADERBOARD_DIR, f"{game_name}_history.json")
-    return game_name, save_file, history_file
-
-# ---- Initialize first game ----
-game_name, SAVE_FILE, HISTORY_FILE = select_game_menu()
+    return game_name
 
 # ---- Load or Initialize Leaderboard ----
 def load_leaderboard():
-    if os.path.exists(SAVE_FILE):
-        with open(SAVE_FILE, "r") as f:
-            data = json.load(f)
-            return {name: env.Rating(mu, sigma) for name, (mu, sigma) in data.items()}
-    return {}
+    return storage.load_leaderboard(game_name)
 
 def save_leaderboard(leaderboard):
-    data = {name: (r.mu, r.sigma) for name, r in leaderboard.items()}
-    with open(SAVE_FILE, "w") as f:
-        json.dump(data, f)
+    storage.save_leaderboard(game_name, leaderboard)
 
 # ---- Load / Save History ----
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return []
+    return storage.load_history(game_name)
 
 def save_history(history):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
-
-# ---- Global Leaderboard ----
-leaderboard = load_leaderboard()
-
-# ---- Recalculate Ratings from History ----
-def recalc_ratings():
-    global leaderboard
-    leaderboard = {}
-    history = load_history()
-    for entry in history:
-        teams = entry["teams"]
-        ranks = entry["ranks"]
-        team_ratings = []
-        for team in teams:
-            ratings = []
-            for player in team:
-                if player not in leaderboard:
-                    leaderboard[player] = env.Rating()
-                ratings.append(leaderboard[player])
-            team_ratings.append(ratings)
-        new_team_ratings = env.rate(team_ratings, ranks=ranks)
-        for team, new_ratings in zip(teams, new_team_ratings):
-            for player, new_rating in zip(team, new_ratings):
-                leaderboard[player] = new_rating
-    save_leaderboard(leaderboard)
+    storage.save_history(game_name, history)
 
 # ---- Record Team Game ----
 def record_team_game(teams, ranks):
-    history = load_history()
-    history.append({
+    global leaderboard
+    match = {
         "teams": teams,
         "ranks": ranks,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
-    save_history(history)
-    recalc_ratings()
+    }
+    leaderboard = storage.record_match(game_name, match)
 
 # ---- Display Leaderboard ----
 def show_leaderboard():
@@ -125,11 +80,11 @@ def show_leaderboard():
         return
     sorted_players = sorted(
         leaderboard.items(),
-        key=lambda item: item[1].mu - 3 * item[1].sigma,
+        key=lambda item: conservative(item[1]["mu"], item[1]["sigma"]),
         reverse=True,
     )
-    for i, (name, rating) in enumerate(sorted_players, start=1):
-        conservative = rating.mu - 3 * rating.sigma
+    for i, (name, r) in enumerate(sorted_players, start=1):
+        rating = conservative(r["mu"], r["sigma"])
         star = ""
         if i == 1:
             star = " 🥇"
@@ -137,55 +92,53 @@ def show_leaderboard():
             star = " 🥈"
         elif i == 3:
             star = " 🥉"
-        print(f"{i:2}. {name:10} | μ={rating.mu:.2f}, σ={rating.sigma:.2f}, rating={conservative:.2f}{star}")
+        print(f"{i:2}. {name:10} | μ={r['mu']:.2f}, σ={r['sigma']:.2f}, rating={rating:.2f}{star}")
     print("="*40 + "\n")
 
 # ---- Wipe Leaderboard ----
 def wipe_leaderboard():
     global leaderboard
     leaderboard = {}
-    if os.path.exists(SAVE_FILE):
-        os.remove(SAVE_FILE)
-    if os.path.exists(HISTORY_FILE):
-        os.remove(HISTORY_FILE)
+    storage.delete_game(game_name)
     print(f"Leaderboard for {game_name.title()} wiped!\n")
 
 # ---- Undo Last Game ----
 def undo_last_game():
-    history = load_history()
-    if not history:
+    global leaderboard
+    match, leaderboard = storage.undo_match(game_name)
+    if match is None:
         print("No games to undo.\n")
         return
-    history.pop()
-    save_history(history)
-    recalc_ratings()
     print("Last game undone!\n")
 
 # ---- Show Game History ----
 def show_history():
-    history = load_history()
-    if not history:
-        print("\nNo games in history.\n")
-        return
-
-    print(f"\n=== Game History: {game_name.title()} ===")
-    for i, entry in enumerate(history, start=1):
-        timestamp = entry.get("timestamp", "Unknown time")
-        print(f"\nGame {i} recorded at: {timestamp}")
-        rank_map = {}
-        for team, rank in zip(entry["teams"], entry["ranks"]):
-            rank_map.setdefault(rank, []).append(",".join(team))
-        for rank in sorted(rank_map.keys()):
-            teams_str = " = ".join(rank_map[rank])
-            print(f"  Rank {rank+1}: {teams_str}")
+    with storage.history_view(game_name) as history:
+        if not len(history):
+            print("\nNo games in history.\n")
+            return
+        print(f"\n=== Game History: {game_name.title()} ===")
+        for i, entry in enumerate(history, start=1):
+            print_match(i, entry)
     print("="*40 + "\n")
 
+def print_match(i, entry):
+    timestamp = entry.get("timestamp", "Unknown time")
+    print(f"\nGame {i} recorded at: {timestamp}")
+    rank_map = {}
+    for team, rank in zip(entry["teams"], entry["ranks"]):
+        rank_map.setdefault(rank, []).append(",".join(team))
+    for rank in sorted(rank_map.keys()):
+        teams_str = " = ".join(rank_map[rank])
+        print(f"  Rank {rank+1}: {teams_str}")
+
 # ---- Export Leaderboard to CSV ----
 def export_leaderboard_csv(filename=None):
     if not leaderboard:
         print("Leaderboard is empty, nothing to export.\n")
         return
     if not filename:
+        os.makedirs(LEADERBOARD_DIR, exist_ok=True)
         filename = os.path.join(LEADERBOARD_DIR, f"{game_name}_leaderboard.csv")
 
     with open(filename, mode="w", newline="", encoding="utf-8") as f:
@@ -193,12 +146,12 @@ def export_leaderboard_csv(filename=None):
         writer.writerow(["Rank", "Player", "Mu", "Sigma", "Conservative Rating"])
         sorted_players = sorted(
             leaderboard.items(),
-            key=lambda item: item[1].mu - 3 * item[1].sigma,
+            key=lambda item: conservative(item[1]["mu"], item[1]["sigma"]),
             reverse=True,
         )
-        for i, (name, rating) in enumerate(sorted_players, start=1):
-            conservative = rating.mu - 3 * rating.sigma
-            writer.writerow([i, name, f"{rating.mu:.2f}", f"{rating.sigma:.2f}", f"{conservative:.2f}"])
+        for i, (name, r) in enumerate(sorted_players, start=1):
+            rating = conservative(r["mu"], r["sigma"])
+            writer.writerow([i, name, f"{r['mu']:.2f}", f"{r['sigma']:.2f}", f"{rating:.2f}"])
 
     print(f"Leaderboard exported to {filename}\n")
 
@@ -209,8 +162,10 @@ def export_history_excel(filename=None):
         print("No game history to export.\n")
         return
     if not filename:
+        os.makedirs(LEADERBOARD_DIR, exist_ok=True)
         filename = os.path.join(LEADERBOARD_DIR, f"{game_name}_history.xlsx")
 
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "Match History"
@@ -225,48 +180,45 @@ def export_history_excel(filename=None):
             teams_str = " = ".join(rank_map[rank])
             ws.append([i, timestamp, rank + 1, teams_str])
 
+    # Ratings after every match, one row per player and match
+    series = storage.rating_series(game_name)
+    ws = wb.create_sheet("Ratings")
+    ws.append(["Game #", "Player", "Mu", "Sigma", "Conservative Rating"])
+    rows = []
+    for player in series.players():
+        numbers, _, mus, sigmas = series.series(player)
+        rows.extend(zip(numbers, [player] * len(numbers), mus, sigmas))
+    for number, player, mu, sigma in sorted(rows):
+        ws.append([number, player, round(mu, 2), round(sigma, 2), round(conservative(mu, sigma), 2)])
+
     wb.save(filename)
     print(f"Match history exported to {filename}\n")
 
 # ---- Plot skill progression graphs ----
 def plot_skill_progression():
-    history = load_history()
-    if not history:
+    # μ after every match, from the stored rating series (no replay), downsampled per player
+    series = storage.rating_series(game_name)
+    if not series.players():
         print("No history to plot.\n")
         return
-
-    # Track μ over time for each player
-    player_history = {}
-
-    temp_leaderboard = {}
-    for entry in history:
-        teams = entry["teams"]
-        for team in teams:
-            for player in team:
-                if player not in temp_leaderboard:
-                    temp_leaderboard[player] = env.Rating()
-        # Rate this game
-        team_ratings = [[temp_leaderboard[player] for player in team] for team in teams]
-        new_team_ratings = env.rate(team_ratings, ranks=entry["ranks"])
-        for team, new_ratings in zip(teams, new_team_ratings):
-            for player, new_rating in zip(team, new_ratings):
-                temp_leaderboard[player] = new_rating
-                player_history.setdefault(player, []).append(new_rating.mu)
-
-    # Plot each player's μ over games
-    plt.figure(figsize=(10,6))
-    for player, mus in player_history.items():
-        plt.plot(range(1, len(mus)+1), mus, marker='o', label=player)
-    plt.xlabel("Game #")
-    plt.ylabel("μ (Skill Rating)")
-    plt.title(f"Skill Progression for {game_name.title()}")
-    plt.legend()
-    plt.grid(True)
+    default = default_players(series)
+    names = input(f"Players to plot, comma-separated (Enter for {', '.join(default)}): ")
+    players = [p.strip() for p in names.split(",") if p.strip()] or default
+    unknown = [p for p in players if p not in series]
+    if unknown:
+        print(f"No games for: {', '.join(unknown)}")
+    import matplotlib.pyplot as plt
+
+    figure, ax = plt.subplots(figsize=(10,6))
+    draw(ax, game_name, chart_data(storage, game_name, players, points=1000))
     plt.show()
 
 # ---- Interactive Menu ----
 def main():
-    global game_name, SAVE_FILE, HISTORY_FILE, leaderboard
+    global game_name, leaderboard
+
+    game_name = select_game_menu()
+    leaderboard = load_leaderboard()
 
     while True:
         print(f"\n=== Managing Leaderboard for: {game_name.title()} ===")
@@ -292,16 +244,7 @@ def main():
                 "Use '=' between teams that tie.\n"
                 "Example: Alice,Bob=Charlie,David;Eve,Frank\n"
             )
-            rank_groups = [grp.strip() for grp in teams_input.split(";") if grp.strip()]
-            teams = []
-            ranks = []
-            for rank, group in enumerate(rank_groups):
-                tied_teams = [t.strip() for t in group.split("=") if t.strip()]
-                for team in tied_teams:
-                    players = [p.strip() for p in team.split(",") if p.strip()]
-                    if players:
-                        teams.append(players)
-                        ranks.append(rank)
+            teams, ranks = parse_result(teams_input)
 
             if len(teams) < 2:
                 print("Need at least 2 teams.\n")
@@ -333,7 +276,7 @@ def main():
             plot_skill_progression()
 
         elif choice == "9":
-            game_name, SAVE_FILE, HISTORY_FILE = select_game_menu()
+            game_name = select_game_menu()
             leaderboard = load_leaderboard()
             print(f"Switched to game: {game_name.title()}\n")
 
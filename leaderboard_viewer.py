@@ -1,13 +1,67 @@
+import json
+import os
+import urllib.request
+from urllib.parse import quote
+
 import streamlit as st
-from GitLab_Persistence import load_leaderboard_from_git, gitlab_list_leaderboards_dir
+from league_picker import league_storage
+from ratings import stats_of
+from storage import DEFAULT_LEAGUE, configured_league
+
+# Published snapshots (see publish_snapshots.py): an http(s) base URL or a local directory.
+SNAPSHOT_URL = os.getenv("SNAPSHOT_URL", "").rstrip("/")
+# api_server.py, for live updates through its change feed
+API_URL = os.getenv("LEADERBOARD_API_URL", "")
 
 st.set_page_config(page_title="Leaderboard Viewer", page_icon="🏆")
 st.title("🏆 Board Game Leaderboard Viewer (Read-only)")
 
+if SNAPSHOT_URL:
+    # Snapshots are published per league; this viewer shows the configured one
+    if configured_league() != DEFAULT_LEAGUE:
+        SNAPSHOT_URL = f"{SNAPSHOT_URL}/{configured_league()}"
+    storage = None
+else:
+    storage = league_storage("gitlab")
+    if storage.league != configured_league():
+        API_URL = ""  # api_server.py serves the configured league only
+
+def _fetch_snapshot_file(name):
+    if SNAPSHOT_URL.startswith(("http://", "https://")):
+        with urllib.request.urlopen(f"{SNAPSHOT_URL}/{name}", timeout=10) as response:
+            return json.load(response)
+    with open(os.path.join(SNAPSHOT_URL, name), encoding="utf-8") as f:
+        return json.load(f)
+
+@st.cache_data(ttl=60)
+def load_manifest():
+    return _fetch_snapshot_file("manifest.json")
+
+@st.cache_data
+def load_snapshot(name):
+    # Snapshot names are content-hashed, so a cached copy never goes stale
+    return _fetch_snapshot_file(name)
+
+def load_ranked(game_name):
+    """Ranked rows for a game: from the published snapshot if configured, else from storage."""
+    if SNAPSHOT_URL:
+        return load_snapshot(load_manifest()["games"][game_name]["json"])["leaderboard"]
+    leaderboard = storage.load_leaderboard(game_name)
+    ranked = sorted(leaderboard.items(), key=lambda kv: kv[1]["mu"] - 3 * kv[1]["sigma"], reverse=True)
+    return [{
+        "rank": i + 1,
+        "player": name,
+        "mu": r["mu"],
+        "sigma": r["sigma"],
+        "rating": r["mu"] - 3 * r["sigma"],
+        **stats_of(r),
+    } for i, (name, r) in enumerate(ranked)]
+
 # --- Select Game ---
-files = gitlab_list_leaderboards_dir()
-game_names = sorted(list({fn.replace("_leaderboard.json","").replace("_history.json","") 
-                          for fn in files if fn.endswith(".json")}))
+if SNAPSHOT_URL:
+    game_names = sorted(load_manifest()["games"])
+else:
+    game_names = storage.list_games()
 
 if not game_names:
     st.info("No games found in the repository.")
@@ -16,9 +70,9 @@ if not game_names:
 game_name = st.selectbox("Select a game to view", options=game_names)
 
 # --- Load Leaderboard ---
-leaderboard = load_leaderboard_from_git(game_name)
+rows = load_ranked(game_name)
 
-if not leaderboard:
+if not rows:
     st.info(f"No leaderboard data yet for {game_name}.")
     st.stop()
 
@@ -26,16 +80,28 @@ if not leaderboard:
 st.subheader(f"Leaderboard: {game_name}")
 st.write("Players are ranked by conservative TrueSkill rating (μ - 3σ).")
 
-# Compute conservative rating
-def conservative(r):
-    return r.get("mu",25.0) - 3 * r.get("sigma",8.333)
-
-sorted_players = sorted(leaderboard.items(), key=lambda kv: conservative(kv[1]), reverse=True)
+if API_URL:
+    from change_feed import live_leaderboard, storage_version
+    if storage is None:
+        # Snapshots do not carry the feed version: start from the server's own copy
+        with urllib.request.urlopen(f"{API_URL.rstrip('/')}/games/{quote(game_name)}/leaderboard", timeout=10) as response:
+            board = json.load(response)
+        live_leaderboard(API_URL, game_name, {r["player"]: r for r in board["players"]}, board["version"])
+    else:
+        leaderboard = storage.load_leaderboard(game_name)
+        live_leaderboard(API_URL, game_name, leaderboard, storage_version(storage, game_name, leaderboard))
+    st.stop()
 
 st.table([{
-    "Rank": i+1,
-    "Player": name,
+    "Rank": r["rank"],
+    "Player": r["player"],
     "μ": f"{r['mu']:.2f}",
     "σ": f"{r['sigma']:.2f}",
-    "Conservative Rating": f"{conservative(r):.2f}"
-} for i, (name, r) in enumerate(sorted_players)])
+    "Conservative Rating": f"{r['rating']:.2f}",
+    "Played": r.get("played", 0),
+    "Wins": r.get("wins", 0),
+    "Podiums": r.get("podiums", 0),
+    "Streak (best)": f"{r.get('streak', 0)} ({r.get('best_streak', 0)})",
+    "Peak": f"{r['peak']:.2f}" if r.get("peak") is not None else "",
+    "Last played": (r.get("last_played") or "")[:10],
+} for r in rows])
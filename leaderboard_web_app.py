@@ -10,6 +10,9 @@ st.markdown("""
 - ✏️ Record Game / Matchmaking
 - 🏆 Leaderboard
 - 📜 Match History
+- 🔮 Season Simulator
+- 📥 Import Matches
+- 🌍 Global Ranking
 """)
 
 # Optional: show next event if available
@@ -0,0 +1,30 @@
+"""
+League selector for the Streamlit apps and pages.
+
+The choice is kept in st.session_state, so it carries over between pages.
+Call league_storage() after st.set_page_config(); it returns the Storage of
+the selected league.
+"""
+import streamlit as st
+from storage import get_storage, normalize_league
+
+NEW_LEAGUE = "New league..."
+
+def league_storage(default="gitlab"):
+    storage = get_storage(default)
+    leagues = storage.list_leagues()
+    current = st.session_state.get("league", storage.league)
+    if current not in leagues:
+        current = storage.league if storage.league in leagues else leagues[0]
+    choice = st.sidebar.selectbox("League", [*leagues, NEW_LEAGUE], index=leagues.index(current))
+    if choice == NEW_LEAGUE:
+        name = st.sidebar.text_input("New league name")
+        if st.sidebar.button("Create league"):
+            try:
+                st.session_state["league"] = storage.add_league(normalize_league(name)).league
+                st.rerun()
+            except ValueError as e:
+                st.sidebar.error(str(e))
+        choice = current
+    st.session_state["league"] = choice
+    return get_storage(default, league=choice)
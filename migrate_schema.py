@@ -0,0 +1,80 @@
+"""
+One-time migration of every leaderboards/* file to the current schema.
+
+    py migrate_schema.py              # migrate the configured backend
+    py migrate_schema.py --dry-run    # only list what would change
+
+Games are converted one at a time (only the encoded output is kept in memory)
+and everything is written as a single batch / GitLab commit. Files that are
+already at the current schema_version are left alone, so it is safe to rerun.
+Leaderboards written before the per-player stats existed get them rebuilt
+from history (ratings are kept).
+"""
+import argparse
+from ratings import get_env, replay, stats_of
+from schema import (
+    SCHEMA_VERSION, is_current, migrate_players, migrate_leaderboard,
+)
+from storage import (
+    get_storage, encode_json, encode_leaderboard, leaderboard_path, PLAYERS_PATH,
+)
+
+def _game_is_current(storage, game_name):
+    index = storage.load_shard_index(game_name)
+    return (
+        index is not None
+        and index.get("schema_version") == SCHEMA_VERSION
+        and is_current(storage.read_json(leaderboard_path(game_name)))
+    )
+
+def with_stats(leaderboard, matches, env):
+    """`leaderboard` with every player's stats (ratings.STATS) rebuilt from `matches`."""
+    replayed = replay(matches, env)
+    for player, entry in leaderboard.items():
+        entry.update(stats_of(replayed.get(player, {})))
+    return leaderboard
+
+def migration_files(storage):
+    """Yield (path, new content or None) for every file that needs migrating."""
+    players = storage.read_json(PLAYERS_PATH)
+    if players is not None and not is_current(players):
+        yield PLAYERS_PATH, encode_json({"schema_version": SCHEMA_VERSION, "players": migrate_players(players)})
+
+    for game_name in storage.list_games():
+        env = get_env(game_name, storage)
+        if _game_is_current(storage, game_name):
+            leaderboard = storage.load_leaderboard(game_name)
+            if all("played" in entry for entry in leaderboard.values()):
+                continue
+            matches = storage.load_history(game_name)
+            yield leaderboard_path(game_name), encode_leaderboard(with_stats(leaderboard, matches, env))
+            continue
+        matches = storage.load_history(game_name)  # converts v1 matches on the way
+        # Old formats tracked wins inconsistently (the CLI's [mu, sigma] not at all): rebuild all stats
+        leaderboard = with_stats(migrate_leaderboard(storage.read_json(leaderboard_path(game_name), {})), matches, env)
+        yield leaderboard_path(game_name), encode_leaderboard(leaderboard)
+        yield from storage.history_files(game_name, matches).items()
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate leaderboards to the current schema.")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    storage = get_storage("local")
+    with storage.transaction():
+        files = {}
+        for path, content in migration_files(storage):
+            action = "delete" if content is None else "write"
+            print(f"{action:6} {path}")
+            files[path] = content
+        if not files:
+            print(f"Everything is already at schema version {SCHEMA_VERSION}.")
+            return
+        if args.dry_run:
+            print(f"\n{len(files)} file(s) would change (dry run).")
+            return
+        storage.write_files(files, f"Migrate leaderboards to schema version {SCHEMA_VERSION}")
+    print(f"\nMigrated {len(files)} file(s) in one commit.")
+
+if __name__ == "__main__":
+    main()
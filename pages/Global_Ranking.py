@@ -0,0 +1,47 @@
+import streamlit as st
+from global_ranking import DEFAULT_SCHEME, load_summaries, rank_players, save_scheme
+from league_picker import league_storage
+
+st.set_page_config(page_title="Global Ranking", page_icon="🌍", layout="wide")
+storage = league_storage("gitlab")
+st.title("🌍 Global Ranking")
+st.write(
+    "The best players across every game of the league: each game counts with its weight, "
+    "a player's standing in a game counts more the more they played it, and a share of the "
+    "score rewards playing a lot."
+)
+
+summaries = load_summaries(storage)
+if not summaries["games"]:
+    st.info("No games found.")
+    st.stop()
+saved = {**DEFAULT_SCHEME, **summaries["scheme"]}
+
+# --- Scheme ---
+with st.expander("Scoring"):
+    modes = ["percentile", "scaled"]
+    mode = st.radio("Per-game skill", modes, index=modes.index(saved["mode"]), horizontal=True,
+                    help="percentile: share of the game's players rated below; scaled: rating between the game's lowest and highest")
+    activity = st.slider("Activity share", 0.0, 1.0, float(saved["activity"]), 0.05)
+    min_played = st.number_input("Matches needed for a game to count", min_value=1, value=int(saved["min_played"]))
+    weights = {}
+    columns = st.columns(4)
+    for i, game in enumerate(sorted(summaries["games"])):
+        weights[game] = columns[i % 4].number_input(game.title(), min_value=0.0, value=float(saved["weights"].get(game, 1.0)), step=0.5)
+    scheme = {"mode": mode, "activity": activity, "min_played": int(min_played),
+              "weights": {g: w for g, w in weights.items() if w != 1.0}}
+    if st.button("Save as league default"):
+        save_scheme(storage, scheme)
+        st.success("Scoring saved.")
+
+# --- Board ---
+rows = rank_players(summaries, scheme)
+if not rows:
+    st.info(f"Nobody has played {scheme['min_played']} matches of a game yet.")
+    st.stop()
+st.dataframe(
+    [{"Rank": r["rank"], "Player": r["player"], "Score": round(r["score"], 3), "Skill": round(r["skill"], 3),
+      "Activity": round(r["activity"], 3), "Games": r["games"], "Played": r["played"], "Wins": r["wins"]}
+     for r in rows],
+    use_container_width=True, hide_index=True,
+)
@@ -0,0 +1,50 @@
+import streamlit as st
+from import_matches import import_matches, read_rows, rows_to_matches
+from league_picker import league_storage
+
+st.set_page_config(page_title="Import Matches", page_icon="📥")
+storage = league_storage("gitlab")
+st.title("📥 Import Matches")
+st.write(
+    "Upload old results as CSV or JSONL. Every row needs a `timestamp` and either a `result` in the "
+    "CLI notation (`Alice,Bob=Charlie;Eve`: `;` between places, `=` between tied teams, `,` between "
+    "team mates) or `teams` and `ranks` columns. Add a `game` column to import several games at once."
+)
+
+uploaded = st.file_uploader("Results file", type=["csv", "jsonl", "ndjson"])
+game_names = storage.list_games()
+game_choice = st.selectbox("Import into", ["(from the file's game column)", *game_names, "New game..."])
+if game_choice == "New game...":
+    game_name = st.text_input("New game name").strip().lower() or None
+elif game_choice in game_names:
+    game_name = game_choice
+else:
+    game_name = None
+
+if uploaded is None:
+    st.stop()
+
+by_game, errors = rows_to_matches(read_rows(uploaded.getvalue(), uploaded.name), game_name)
+if errors:
+    st.error(f"{len(errors)} invalid row(s). Fix them and upload again; nothing has been imported.")
+    st.code("\n".join(errors[:50]) + ("\n..." if len(errors) > 50 else ""))
+    st.stop()
+if not by_game:
+    st.info("The file contains no matches.")
+    st.stop()
+
+preview = import_matches(storage, by_game, dry_run=True)
+st.subheader("Preview")
+st.dataframe(
+    [{"Game": g, "New matches": s["added"], "Duplicates skipped": s["duplicates"], "History after import": s["total"]}
+     for g, s in preview.items()],
+    use_container_width=True, hide_index=True,
+)
+
+if not any(s["added"] for s in preview.values()):
+    st.info("Everything in this file is already in the history.")
+elif st.button("Import"):
+    with st.spinner("Merging history and rebuilding ratings..."):
+        summary = import_matches(storage, by_game)
+    added = sum(s["added"] for s in summary.values())
+    st.success(f"Imported {added} match(es) into {', '.join(summary)} in one commit.")
@@ -2,27 +2,23 @@ import streamlit as st
 import pandas as pd
 import sys
 import os
-from GitLab_Persistence import (
-    load_players_from_git,
-    load_leaderboard_from_git,
-    load_history_from_git,
-    save_leaderboard_to_git,   # ← add this
-    gitlab_list_leaderboards_dir
-)
-
 
 # --- Root path setup ---
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+from league_picker import league_storage
+from ratings import game_params, stats_of
+from storage import configured_league
+
 st.set_page_config(page_title="Leaderboard", page_icon="🏆")
+storage = league_storage("gitlab")
 st.title("🏆 Leaderboards")
 
 # --- Load games ---
 try:
-    game_files = gitlab_list_leaderboards_dir()
-    all_games = [f.replace("_leaderboard.json", "") for f in game_files if f.endswith("_leaderboard.json")]
+    all_games = storage.list_games()
 except Exception as e:
     st.error(f"Failed to load games: {e}")
     all_games = []
@@ -34,23 +30,39 @@ if not all_games:
 selected_game = st.selectbox("Select a game", all_games)
 
 # --- Load leaderboard ---
-leaderboard = load_leaderboard_from_git(selected_game) or {}
+leaderboard = storage.load_leaderboard(selected_game)
 
 # --- Display leaderboard ---
+COLUMNS = ["Player", "Skill", "Played", "Wins", "Win %", "Podiums", "Streak", "Best Streak", "Peak", "Last Played"]
 rows = []
-for player, stats in leaderboard.items():
-    mu = stats.get("mu", 25.0) if isinstance(stats, dict) else 25.0
-    sigma = stats.get("sigma", 8.333) if isinstance(stats, dict) else 8.333
-    wins = stats.get("wins", 0) if isinstance(stats, dict) else 0
-    rows.append({"Player": player, "Skill": f"{mu:.2f} ± {sigma:.2f}", "Wins": wins})
+for player, entry in leaderboard.items():
+    stats = stats_of(entry)
+    rows.append({
+        "Player": player,
+        "Skill": f"{entry['mu']:.2f} ± {entry['sigma']:.2f}",
+        "Played": stats["played"],
+        "Wins": stats["wins"],
+        "Win %": f"{100 * stats['wins'] / stats['played']:.0f}%" if stats["played"] else "",
+        "Podiums": stats["podiums"],
+        "Streak": stats["streak"],
+        "Best Streak": stats["best_streak"],
+        "Peak": f"{stats['peak']:.2f}" if stats["peak"] is not None else "",
+        "Last Played": (stats["last_played"] or "")[:10],
+    })
 
 df = pd.DataFrame(rows)
+# api_server.py serves the configured league only
+api_url = os.getenv("LEADERBOARD_API_URL") if storage.league == configured_league() else None
 
-if not df.empty:
+if not df.empty and api_url:
+    # Follows api_server.py's change feed and updates in place, no reruns needed
+    from change_feed import live_leaderboard, storage_version
+    live_leaderboard(api_url, selected_game, leaderboard, storage_version(storage, selected_game, leaderboard))
+elif not df.empty:
     df = df.sort_values(by="Skill", ascending=False).reset_index(drop=True)
     df.index += 1
     df.index.name = "Rank"
-    st.dataframe(df[["Player", "Skill", "Wins"]], use_container_width=True, hide_index=False)
+    st.dataframe(df[COLUMNS], use_container_width=True, hide_index=False)
 else:
     st.info(f"No players yet for {selected_game}. Record a game to start tracking stats!")
 # ---------------- Admin Reset Feature ----------------
@@ -60,12 +72,15 @@ st.subheader("⚠️ Admin Tools")
 admin_code = st.text_input("Enter admin code to unlock reset tools", type="password")
 
 if admin_code == os.getenv("ADMIN_CODE", "letmein"):  # Replace with a secure method later
-    if st.button(f"🔄 Reset Stats for {selected_game}"):
-        for player in leaderboard:
-            leaderboard[player]["mu"] = 25.0
-            leaderboard[player]["sigma"] = 8.333
-            leaderboard[player]["wins"] = 0
-        save_leaderboard_to_git(selected_game, leaderboard, commit_message=f"Reset stats for {selected_game}")
-        st.success(f"{selected_game} stats reset to default!")
+    if st.button(f"🔄 Reset Ratings for {selected_game}"):
+        # Only the ratings restart; played/wins/streaks describe the recorded history and stay
+        params = game_params(selected_game, storage)
+        with storage.transaction():
+            leaderboard = storage.load_leaderboard(selected_game)
+            for player in leaderboard:
+                leaderboard[player]["mu"] = params["mu"]
+                leaderboard[player]["sigma"] = params["sigma"]
+            storage.save_leaderboard(selected_game, leaderboard, commit_message=f"Reset ratings for {selected_game}")
+        st.success(f"{selected_game} ratings reset to default!")
 
 
@@ -1,71 +1,58 @@
 import streamlit as st
-from GitLab_Persistence import (
-    gitlab_list_leaderboards_dir,
-    load_history_from_git
-)
+from league_picker import league_storage
 from datetime import datetime
 
 st.set_page_config(page_title="Match History", page_icon="📜")
+storage = league_storage("gitlab")
 st.title("📜 Match History")
 
 # --- Select Game ---
-files = gitlab_list_leaderboards_dir()
-game_names = sorted(list({fn.replace("_leaderboard.json","").replace("_history.json","") for fn in files if fn.endswith(".json")}))
+game_names = storage.list_games()
 game_name = st.selectbox("Select game", options=game_names)
 
 if not game_name:
     st.info("No games found.")
     st.stop()
 
-history = load_history_from_git(game_name)
-matches = history.get("matches", [])
-
-if not matches:
-    st.info(f"No match history for {game_name}.")
-    st.stop()
-
-st.subheader(f"Match History for {game_name}")
-
-# Display matches
-for i, match in enumerate(matches[::-1], start=1):
-    # Safely get timestamp
-    ts = match.get("timestamp")
-    if ts:
-        try:
-            ts = datetime.fromisoformat(ts).strftime("%Y-%m-%d %H:%M UTC")
-        except Exception:
-            ts = "Invalid timestamp"
-    else:
-        ts = "Unknown time"
-
-    match_type = match.get("type", "unknown")
-
-    if match_type == "1v1" or match_type == "individual":
-        results = match.get("players") or match.get("results") or []
-        winner = match.get("winner", "Unknown")
-        st.markdown(f"**{i}. {ts}** — 1v1: {', '.join(results)} (Winner: {winner})")
-
-    elif match_type == "team":
-        team1 = match.get("team1") or match.get("team_a") or []
-        team2 = match.get("team2") or match.get("team_b") or []
-        winner = match.get("winner", "Unknown")
-        st.markdown(
-            f"**{i}. {ts}** — Team Match:\n"
-            f"- Team 1: {', '.join(team1)}\n"
-            f"- Team 2: {', '.join(team2)}\n"
-            f"- Winner: {winner}"
-        )
-
-    elif match_type == "ffa":
-        players = match.get("players", [])
-        winner = match.get("winner", "Unknown")
-        st.markdown(
-            f"**{i}. {ts}** — Free-for-All:\n"
-            f"- Players: {', '.join(players)}\n"
-            f"- Winner: {winner}"
-        )
-
-    else:
-        st.markdown(f"**{i}. {ts}** — Unknown match type")
-
-    st.markdown("---")
+PAGE_SIZE = 20
+MATCH_LABELS = {"1v1": "1v1", "team": "Team Match", "ffa": "Free-for-All"}
+
+# Closed on every exit, st.stop() included, so no shard stays mapped
+with storage.history_view(game_name) as history:
+    if not len(history):
+        st.info(f"No match history for {game_name}.")
+        st.stop()
+
+    st.subheader(f"Match History for {game_name}")
+
+    # Only the newest matches that are shown get decoded; "Show more" pages further back
+    shown_key = f"history_shown_{game_name}"
+    shown = st.session_state.get(shown_key, PAGE_SIZE)
+
+    # Display matches
+    for i, match in history.newest_first(shown):
+        # Safely get timestamp
+        ts = match.get("timestamp")
+        if ts:
+            try:
+                ts = datetime.fromisoformat(ts).strftime("%Y-%m-%d %H:%M UTC")
+            except Exception:
+                ts = "Invalid timestamp"
+        else:
+            ts = "Unknown time"
+
+        label = MATCH_LABELS.get(match.get("type"), "Match")
+        rank_map = {}
+        for team, rank in zip(match["teams"], match["ranks"]):
+            rank_map.setdefault(rank, []).append(", ".join(team))
+        lines = [f"- Rank {rank + 1}: {' = '.join(rank_map[rank])}" for rank in sorted(rank_map)]
+        st.markdown(f"**{i}. {ts}** — {label}:\n" + "\n".join(lines))
+
+        st.markdown("---")
+
+    total = len(history)
+
+if shown < total:
+    if st.button(f"Show more ({total - shown} older)"):
+        st.session_state[shown_key] = shown + PAGE_SIZE
+        st.rerun()
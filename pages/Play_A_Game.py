@@ -1,24 +1,14 @@
 import streamlit as st
-from GitLab_Persistence import (
-    load_players_from_git,
-    save_players_to_git,
-    load_leaderboard_from_git,
-    save_leaderboard_to_git,
-    load_history_from_git,
-    save_history_to_git,
-    gitlab_list_leaderboards_dir
-)
-import trueskill
+from ratings import get_env
+from league_picker import league_storage
 from datetime import datetime
 
 st.title("🎲 Play a Game")
 
-# --- TrueSkill environment ---
-env = trueskill.TrueSkill(draw_probability=0.0)
+storage = league_storage("gitlab")
 
 # --- Load players ---
-players_dict = load_players_from_git()
-players = players_dict.get("players", [])
+players = storage.load_players()
 
 if not players:
     st.warning("No players available. Add players in the Player Manager first.")
@@ -26,8 +16,7 @@ if not players:
 
 # --- Load games ---
 try:
-    game_files = gitlab_list_leaderboards_dir()
-    all_games = [f.replace("_leaderboard.json", "") for f in game_files if f.endswith("_leaderboard.json")]
+    all_games = storage.list_games()
 except Exception as e:
     st.error(f"Failed to load games: {e}")
     all_games = []
@@ -41,21 +30,11 @@ if new_game_name.strip():
 if not selected_game:
     st.stop()
 
-# --- Load leaderboard and normalize old formats ---
-leaderboard = load_leaderboard_from_git(selected_game)
-for player, value in list(leaderboard.items()):
-    if isinstance(value, list) and len(value) == 2:  # old format [mu, sigma]
-        leaderboard[player] = {"mu": value[0], "sigma": value[1], "wins": 0}
-    elif isinstance(value, dict):
-        leaderboard[player].setdefault("mu", env.mu)
-        leaderboard[player].setdefault("sigma", env.sigma)
-        leaderboard[player].setdefault("wins", 0)
-    else:
-        leaderboard[player] = {"mu": env.mu, "sigma": env.sigma, "wins": 0}
-
-history = load_history_from_git(selected_game)
-if "matches" not in history:
-    history["matches"] = []
+# --- TrueSkill environment (fitted per game by fit_params.py) ---
+env = get_env(selected_game, storage)
+
+# --- Load leaderboard (entries carry "mu", "sigma" and the ratings.STATS aggregates; use stats_of() for defaults) ---
+leaderboard = storage.load_leaderboard(selected_game)
 
 # --- Game type selection ---
 st.subheader("Game Type")
@@ -71,36 +50,17 @@ if game_type == "1v1":
         st.warning("Select two different players.")
         st.stop()
 
-    # Ensure both players exist in leaderboard
-    for p in [p1, p2]:
-        if p not in leaderboard or not isinstance(leaderboard[p], dict):
-            leaderboard[p] = {"mu": env.mu, "sigma": env.sigma, "wins": 0}
-
     winner = st.radio("Winner", [p1, p2], key="1v1_winner")
 
     if st.button("Record 1v1 Game"):
         try:
-            r1 = env.create_rating(leaderboard[p1]["mu"], leaderboard[p1]["sigma"])
-            r2 = env.create_rating(leaderboard[p2]["mu"], leaderboard[p2]["sigma"])
-
-            # Wrap each player in a list (group) and set ranks
-            ranks = [0, 1] if winner == p1 else [1, 0]
-            rated = env.rate([[r1], [r2]], ranks=ranks)
-
-            leaderboard[p1]["mu"], leaderboard[p1]["sigma"] = rated[0][0].mu, rated[0][0].sigma
-            leaderboard[p2]["mu"], leaderboard[p2]["sigma"] = rated[1][0].mu, rated[1][0].sigma
-            leaderboard[winner]["wins"] += 1
-
-            save_leaderboard_to_git(selected_game, leaderboard)
-
             history_entry = {
                 "type": "1v1",
-                "players": [p1, p2],
-                "winner": winner,
+                "teams": [[p1], [p2]],
+                "ranks": [0, 1] if winner == p1 else [1, 0],
                 "timestamp": datetime.utcnow().isoformat()
             }
-            history["matches"].append(history_entry)
-            save_history_to_git(selected_game, history)
+            storage.record_match(selected_game, history_entry)
 
             st.success("1v1 game recorded.")
         except Exception as e:
@@ -136,42 +96,13 @@ elif game_type == "Team":
                 st.error("Select at least 2 players")
             else:
                 try:
-                    # Ensure all players exist in leaderboard
-                    for p in selected_players:
-                        if p not in leaderboard:
-                            leaderboard[p] = {"mu": env.mu, "sigma": env.sigma, "wins": 0}
-
-                    team1_group = [env.create_rating(leaderboard[p]["mu"], leaderboard[p]["sigma"]) for p in team1]
-                    team2_group = [env.create_rating(leaderboard[p]["mu"], leaderboard[p]["sigma"]) for p in team2]
-
-                    if winner_team == "Team 1":
-                        rated_teams = env.rate([team1_group, team2_group])
-                    else:
-                        rated_teams = env.rate([team2_group, team1_group])
-                        rated_teams = rated_teams[::-1]
-
-                    rated1, rated2 = rated_teams
-
-                    for idx, p in enumerate(team1):
-                        leaderboard[p]["mu"], leaderboard[p]["sigma"] = rated1[idx].mu, rated1[idx].sigma
-                        if winner_team == "Team 1":
-                            leaderboard[p]["wins"] += 1
-                    for idx, p in enumerate(team2):
-                        leaderboard[p]["mu"], leaderboard[p]["sigma"] = rated2[idx].mu, rated2[idx].sigma
-                        if winner_team == "Team 2":
-                            leaderboard[p]["wins"] += 1
-
-                    save_leaderboard_to_git(selected_game, leaderboard)
-
                     history_entry = {
                         "type": "team",
-                        "team1": team1,
-                        "team2": team2,
-                        "winner": winner_team,
+                        "teams": [team1, team2],
+                        "ranks": [0, 1] if winner_team == "Team 1" else [1, 0],
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    history["matches"].append(history_entry)
-                    save_history_to_git(selected_game, history)
+                    storage.record_match(selected_game, history_entry)
 
                     st.success("Team game recorded.")
 
@@ -196,32 +127,13 @@ elif game_type == "Free-for-All":
                 st.error("All selected players must be placed in finishing order.")
             else:
                 try:
-                    # Ensure all players exist in leaderboard
-                    for p in finishing_order:
-                        if p not in leaderboard:
-                            leaderboard[p] = {"mu": env.mu, "sigma": env.sigma, "wins": 0}
-
-                    ratings = [env.create_rating(leaderboard[p]["mu"], leaderboard[p]["sigma"]) for p in finishing_order]
-                    ranked_ratings = [[r] for r in ratings]
-                    ranks = list(range(len(finishing_order)))
-                    rated = env.rate(ranked_ratings, ranks=ranks)
-
-                    for idx, p in enumerate(finishing_order):
-                        new_rating = rated[idx][0]
-                        leaderboard[p]["mu"], leaderboard[p]["sigma"] = new_rating.mu, new_rating.sigma
-                        if idx == 0:
-                            leaderboard[p]["wins"] += 1
-
-                    save_leaderboard_to_git(selected_game, leaderboard)
-
                     history_entry = {
                         "type": "ffa",
-                        "players": finishing_order,
-                        "winner": finishing_order[0],
+                        "teams": [[p] for p in finishing_order],
+                        "ranks": list(range(len(finishing_order))),
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    history["matches"].append(history_entry)
-                    save_history_to_git(selected_game, history)
+                    storage.record_match(selected_game, history_entry)
 
                     st.success("Free-for-All game recorded.")
                 except Exception as e:
@@ -1,11 +1,13 @@
 import streamlit as st
-from GitLab_Persistence import load_players_from_git, save_players_to_git
+from rename_player import rename_player
+from league_picker import league_storage
+
+storage = league_storage("gitlab")
 
 st.title("👥 Manage Players")
 
 # --- Load players ---
-players_dict = load_players_from_git()
-player_list = players_dict.get("players", [])
+player_list = storage.load_players()
 
 # --- Display current players ---
 if player_list:
@@ -24,9 +26,11 @@ if st.button("Add Player"):
     elif new_player.strip() in player_list:
         st.warning(f"{new_player} already exists.")
     else:
-        player_list.append(new_player.strip())
-        players_dict["players"] = player_list
-        save_players_to_git(players_dict)
+        with storage.transaction():
+            player_list = storage.load_players()
+            if new_player.strip() not in player_list:
+                player_list.append(new_player.strip())
+                storage.save_players(player_list)
         st.success(f"{new_player.strip()} added.")
         st.rerun()   # ✅ correct in modern Streamlit
 
@@ -35,8 +39,36 @@ st.subheader("Remove Player")
 remove_player = st.selectbox("Select a player to remove", [""] + player_list)
 if st.button("Remove Player"):
     if remove_player in player_list:
-        player_list.remove(remove_player)
-        players_dict["players"] = player_list
-        save_players_to_git(players_dict)
+        with storage.transaction():
+            player_list = storage.load_players()
+            if remove_player in player_list:
+                player_list.remove(remove_player)
+                storage.save_players(player_list)
         st.success(f"{remove_player} removed.")
         st.rerun()   # ✅ correct in modern Streamlit
+
+# --- Rename / merge player ---
+st.subheader("Rename or Merge Player")
+st.caption("Renames the player in every game's leaderboard and history in this league. Picking an existing name merges the two.")
+old_name = st.selectbox("Player to rename", [""] + player_list, key="rename_old")
+new_name = st.text_input("New name (or the player to merge into)", key="rename_new").strip()
+
+if st.button("Preview changes"):
+    try:
+        report = rename_player(storage, old_name, new_name, dry_run=True)
+        st.session_state["rename_preview"] = (storage.league, old_name, new_name, report)
+    except ValueError as e:
+        st.error(str(e))
+
+preview = st.session_state.get("rename_preview")
+if old_name and preview and preview[:3] == (storage.league, old_name, new_name):
+    st.code("\n".join(preview[3]) or f"{old_name} does not appear anywhere.")
+    if preview[3] and st.button(f"Apply: {old_name} → {new_name}"):
+        try:
+            rename_player(storage, old_name, new_name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            del st.session_state["rename_preview"]
+            st.success(f"{old_name} is now {new_name} everywhere.")
+            st.rerun()
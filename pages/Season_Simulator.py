@@ -0,0 +1,43 @@
+import streamlit as st
+from ratings import game_params
+from season_sim import simulate_season
+from league_picker import league_storage
+
+st.set_page_config(page_title="Season Simulator", page_icon="🔮")
+storage = league_storage("gitlab")
+st.title("🔮 Season Simulator")
+st.write(
+    "Simulates whole seasons from the current ratings: each player's skill is drawn from "
+    "their μ and σ, every game is a free-for-all, and players earn one point per opponent beaten."
+)
+
+# --- Select Game ---
+game_names = storage.list_games()
+if not game_names:
+    st.info("No games found.")
+    st.stop()
+game_name = st.selectbox("Select game", options=game_names)
+
+leaderboard = storage.load_leaderboard(game_name)
+if len(leaderboard) < 2:
+    st.info(f"{game_name} needs at least 2 rated players to simulate a season.")
+    st.stop()
+
+players = st.multiselect("Players", list(leaderboard), default=list(leaderboard))
+games = st.slider("Games per season", min_value=1, max_value=100, value=20)
+seasons = st.select_slider("Simulated seasons", options=[1_000, 10_000, 50_000, 100_000, 250_000], value=100_000)
+
+if st.button("Run simulation"):
+    if len(players) < 2:
+        st.error("Select at least 2 players.")
+        st.stop()
+    with st.spinner(f"Simulating {seasons:,} seasons..."):
+        result = simulate_season(leaderboard, players, seasons, games, beta=game_params(game_name, storage)["beta"])
+
+    st.subheader("Finishing positions")
+    st.dataframe(result.rows(), use_container_width=True, hide_index=True)
+    st.bar_chart({"Chance of finishing first": dict(zip(result.players, result.win_probability()))})
+    st.write(
+        f"The eventual champion is leading for good from game **{result.settle_quantile(0.5)}** "
+        f"in half of the seasons, and by game **{result.settle_quantile(0.9)}** in 90% of them."
+    )
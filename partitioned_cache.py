@@ -0,0 +1,54 @@
+"""
+An LRU cache split into partitions (one per league) that share one capacity.
+
+When the cache is full the least recently used entry of the *largest*
+partition is evicted. A busy league can use spare room, but it cannot push a
+quiet league's few entries out: each partition keeps at least its fair share.
+"""
+import threading
+from collections import OrderedDict
+
+
+class PartitionedLRU:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._partitions = {}  # partition -> OrderedDict(key -> value), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, partition, key, default=None):
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None or key not in entries:
+                return default
+            entries.move_to_end(key)
+            return entries[key]
+
+    def put(self, partition, key, value):
+        with self._lock:
+            entries = self._partitions.setdefault(partition, OrderedDict())
+            if key in entries:
+                entries.move_to_end(key)
+            else:
+                self._size += 1
+            entries[key] = value
+            while self._size > self.capacity:
+                largest = max(self._partitions.values(), key=len)
+                largest.popitem(last=False)
+                self._size -= 1
+
+    def clear(self, partition=None):
+        with self._lock:
+            if partition is None:
+                self._partitions.clear()
+                self._size = 0
+            else:
+                self._size -= len(self._partitions.pop(partition, ()))
+
+    def sizes(self):
+        """{partition: number of entries}."""
+        with self._lock:
+            return {p: len(e) for p, e in self._partitions.items() if e}
+
+    def __len__(self):
+        return self._size
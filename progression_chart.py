@@ -0,0 +1,102 @@
+"""
+Skill-progression charts whose cost does not grow with the history.
+
+Each player's μ series is downsampled with Largest-Triangle-Three-Buckets
+(LTTB) to about one point per horizontal pixel. Unlike taking every n-th
+point, LTTB keeps the peaks and dips that give a line its shape. Chart data
+and rendered PNGs go into a small LRU cache keyed by game, history version
+and options, so a Streamlit rerun or a repeated plot is a dictionary lookup.
+The cache is partitioned by league and evicts fairly between them. Only the
+selected players are drawn (by default the most active ones).
+"""
+import io
+
+from partitioned_cache import PartitionedLRU
+
+DEFAULT_PLAYERS = 8     # drawn when nobody is selected
+MARKER_LIMIT = 60       # series this short still get a marker per game
+CACHE_SIZE = 32
+
+_cache = PartitionedLRU(CACHE_SIZE)
+
+def lttb(xs, ys, threshold):
+    """Indices of the `threshold` points LTTB keeps (every index if there are no more than that)."""
+    n = len(xs)
+    if n <= threshold:
+        return list(range(n))
+    threshold = max(threshold, 3)
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[start:end]) / (end - start)
+        avg_y = sum(ys[start:end]) / (end - start)
+        ax, ay = xs[a], ys[a]
+        best, best_area = start - 1, -1.0
+        for j in range(int(i * every) + 1, start):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+def _cached(storage, key, build):
+    value = _cache.get(storage.league, (storage, *key))
+    if value is None:
+        value = build()
+        _cache.put(storage.league, (storage, *key), value)
+    return value
+
+def default_players(series, limit=DEFAULT_PLAYERS):
+    """The `limit` players with the most games."""
+    return sorted(series.players(), key=lambda p: -len(series.series(p)[0]))[:limit]
+
+def chart_data(storage, game_name, players=None, points=400):
+    """{player: ([game #], [μ])} with at most `points` points per player."""
+    version = storage.history_version(game_name)
+    selection = tuple(players) if players is not None else None
+
+    def build():
+        series = storage.rating_series(game_name)
+        chosen = default_players(series) if selection is None else [p for p in selection if p in series]
+        data = {}
+        for player in chosen:
+            mus = series.series(player)[2]
+            games = range(1, len(mus) + 1)
+            keep = lttb(games, mus, points)
+            data[player] = ([games[i] for i in keep], [mus[i] for i in keep])
+        return data
+
+    return _cached(storage, ("data", game_name, version, selection, points), build)
+
+def draw(ax, game_name, data):
+    """Plot chart_data output onto a matplotlib Axes."""
+    for player, (games, mus) in data.items():
+        ax.plot(games, mus, marker="o" if len(games) <= MARKER_LIMIT else None, label=player)
+    ax.set_xlabel("Game #")
+    ax.set_ylabel("μ (Skill Rating)")
+    ax.set_title(f"Skill Progression for {game_name.title()}")
+    if data:
+        ax.legend()
+    ax.grid(True)
+
+def render_png(storage, game_name, players=None, width=10, height=6, dpi=100):
+    """PNG bytes of the chart, downsampled to one point per horizontal pixel."""
+    version = storage.history_version(game_name)
+    selection = tuple(players) if players is not None else None
+
+    def build():
+        # Figure without pyplot: no GUI backend, no global state, safe in threads
+        from matplotlib.figure import Figure
+        data = chart_data(storage, game_name, selection, points=int(width * dpi))
+        figure = Figure(figsize=(width, height), dpi=dpi)
+        draw(figure.subplots(), game_name, data)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format="png")
+        return buffer.getvalue()
+
+    return _cached(storage, ("png", game_name, version, selection, width, height, dpi), build)
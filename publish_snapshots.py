@@ -0,0 +1,246 @@
+"""
+Publish precomputed, read-only snapshots of every leaderboard.
+
+    py publish_snapshots.py                   # publish all games into public/
+    py publish_snapshots.py --out site/       # somewhere else
+    py publish_snapshots.py --every 600       # keep running, every 10 minutes
+
+For each game a JSON snapshot (ranked table, recent matches, rating
+progression) and a static HTML page are written under content-hashed names,
+<game>.<hash>.json / .html, so they never change once published and any static
+host or CDN can cache them forever. manifest.json (short cache) points to the
+current files; the _headers file carries those cache rules for hosts that read
+it (Netlify, Cloudflare Pages). Files of the previous generation are kept so
+viewers holding an old manifest still resolve, older ones are deleted.
+
+Set LEADERBOARD_PUBLISH_DIR to have get_storage() republish the affected game
+in the background after every write, and SNAPSHOT_URL to make
+leaderboard_viewer.py read the snapshots instead of calling GitLab.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from file_lock import atomic_write
+from progression_chart import lttb
+from ratings import conservative, stats_of
+from storage import games_in_paths, get_storage
+
+DEFAULT_OUT_DIR = "public"
+MANIFEST = "manifest.json"
+RECENT_MATCHES = 20
+PROGRESSION_POINTS = 200
+HASHED_NAME = re.compile(r"^(?P<slug>.+)\.(?P<hash>[0-9a-f]{12})\.(json|html)$")
+
+HEADERS = """/*.json
+  Cache-Control: public, max-age=31536000, immutable
+/*.html
+  Cache-Control: public, max-age=31536000, immutable
+/manifest.json
+  Cache-Control: public, max-age=60, must-revalidate
+/index.html
+  Cache-Control: public, max-age=60, must-revalidate
+"""
+
+def slugify(game_name):
+    return re.sub(r"[^a-z0-9_-]+", "-", game_name.lower()).strip("-") or "game"
+
+def hashed_name(slug, content, extension):
+    return f"{slug}.{hashlib.sha1(content).hexdigest()[:12]}.{extension}"
+
+# ---- Snapshot content ----
+def progression(rating_series):
+    """{player: [[match number, μ], ...]} after each of their matches, downsampled (LTTB) to PROGRESSION_POINTS."""
+    series = {}
+    for player in rating_series.players():
+        numbers, _, mus, _ = rating_series.series(player)
+        keep = lttb(numbers, mus, PROGRESSION_POINTS)
+        series[player] = [[numbers[i], round(mus[i], 3)] for i in keep]
+    return series
+
+def game_snapshot(storage, game_name):
+    leaderboard = storage.load_leaderboard(game_name)
+    ranked = sorted(leaderboard.items(), key=lambda kv: conservative(kv[1]["mu"], kv[1]["sigma"]), reverse=True)
+    rows = [{
+        "rank": i + 1,
+        "player": name,
+        "mu": round(r["mu"], 3),
+        "sigma": round(r["sigma"], 3),
+        "rating": round(conservative(r["mu"], r["sigma"]), 3),
+        **stats_of(r),
+        "peak": round(r["peak"], 3) if r.get("peak") is not None else None,
+    } for i, (name, r) in enumerate(ranked)]
+    # Nothing time-dependent goes in here, so an unchanged game keeps its hash
+    with storage.history_view(game_name) as view:
+        recent = [{"number": number, **match} for number, match in view.newest_first(RECENT_MATCHES)]
+        total = len(view)
+    return {
+        "game": game_name,
+        "updated_at": recent[0].get("timestamp", "") if recent else "",
+        "matches": total,
+        "leaderboard": rows,
+        "recent_matches": recent,
+        "progression": progression(storage.rating_series(game_name)),
+    }
+
+# ---- HTML rendering ----
+def _match_text(match):
+    order = sorted(range(len(match["teams"])), key=lambda i: match["ranks"][i])
+    return " > ".join(" & ".join(match["teams"][i]) for i in order)
+
+def _svg_chart(series, width=640, height=260):
+    points = [p for values in series.values() for p in values]
+    if not points:
+        return ""
+    x_max = max(p[0] for p in points) or 1
+    y_min, y_max = min(p[1] for p in points), max(p[1] for p in points)
+    y_span = (y_max - y_min) or 1
+    lines = []
+    for k, (player, values) in enumerate(sorted(series.items())):
+        coords = " ".join(
+            f"{p[0] / x_max * (width - 20) + 10:.1f},{height - 10 - (p[1] - y_min) / y_span * (height - 20):.1f}"
+            for p in values
+        )
+        hue = (k * 137) % 360
+        lines.append(
+            f'<polyline fill="none" stroke="hsl({hue},65%,45%)" stroke-width="1.5" points="{coords}">'
+            f"<title>{html.escape(player)}</title></polyline>"
+        )
+    return f'<svg viewBox="0 0 {width} {height}" width="100%" role="img">{"".join(lines)}</svg>'
+
+def render_html(snapshot):
+    title = html.escape(snapshot["game"].title())
+    table = "".join(
+        f"<tr><td>{r['rank']}</td><td>{html.escape(r['player'])}</td><td>{r['mu']:.2f}</td>"
+        f"<td>{r['sigma']:.2f}</td><td>{r['rating']:.2f}</td><td>{r['played']}</td><td>{r['wins']}</td>"
+        f"<td>{r['podiums']}</td><td>{r['best_streak']}</td></tr>"
+        for r in snapshot["leaderboard"]
+    )
+    recent = "".join(
+        f"<li>#{m['number']} {html.escape(m.get('timestamp', '')[:16])}: {html.escape(_match_text(m))}</li>"
+        for m in snapshot["recent_matches"]
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} leaderboard</title>
+<style>body{{font-family:sans-serif;max-width:720px;margin:2em auto}}table{{border-collapse:collapse;width:100%}}
+td,th{{border-bottom:1px solid #ddd;padding:4px 8px;text-align:left}}</style></head>
+<body><h1>🏆 {title}</h1>
+<p>Ranked by conservative TrueSkill rating (μ - 3σ). {snapshot['matches']} matches, last played {snapshot['updated_at'][:16] or 'never'}.</p>
+<table><tr><th>Rank</th><th>Player</th><th>μ</th><th>σ</th><th>Rating</th><th>Played</th><th>Wins</th><th>Podiums</th><th>Best streak</th></tr>{table}</table>
+<h2>Rating progression (μ)</h2>{_svg_chart(snapshot['progression'])}
+<h2>Recent matches</h2><ol reversed>{recent}</ol>
+</body></html>
+"""
+
+def render_index(manifest):
+    links = "".join(
+        f'<li><a href="{entry["html"]}">{html.escape(game.title())}</a> ({entry["players"]} players, {entry["matches"]} matches)</li>'
+        for game, entry in sorted(manifest["games"].items())
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Leaderboards</title></head>
+<body><h1>🏆 Board Game Leaderboards</h1><ul>{links}</ul></body></html>
+"""
+
+# ---- Publishing ----
+def _write(out_dir, name, content):
+    # Unique temp name and fsync: publishes from several writers can overlap
+    atomic_write(os.path.join(out_dir, name), content)
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"games": {}}
+
+def publish(storage, out_dir=DEFAULT_OUT_DIR, games=None):
+    """Publish snapshots for `games` (default: all) and return the new manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    previous = load_manifest(out_dir)
+    all_games = storage.list_games()
+    manifest = {"generated_at": datetime.utcnow().isoformat(), "games": {}}
+    for game_name in all_games:
+        if games is not None and game_name not in games and game_name in previous["games"]:
+            manifest["games"][game_name] = previous["games"][game_name]
+            continue
+        snapshot = game_snapshot(storage, game_name)
+        slug = slugify(game_name)
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        page = render_html(snapshot).encode("utf-8")
+        entry = {
+            "json": hashed_name(slug, data, "json"),
+            "html": hashed_name(slug, page, "html"),
+            "players": len(snapshot["leaderboard"]),
+            "matches": snapshot["matches"],
+        }
+        for name, content in ((entry["json"], data), (entry["html"], page)):
+            if not os.path.exists(os.path.join(out_dir, name)):
+                _write(out_dir, name, content)
+        manifest["games"][game_name] = entry
+
+    _write(out_dir, "index.html", render_index(manifest).encode("utf-8"))
+    _write(out_dir, "_headers", HEADERS.encode("utf-8"))
+    _write(out_dir, MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    # Keep the current and the previous generation, drop anything older
+    keep = {name for m in (manifest, previous) for e in m["games"].values() for name in (e["json"], e["html"])}
+    for name in os.listdir(out_dir):
+        if HASHED_NAME.match(name) and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+    return manifest
+
+# ---- Republish after writes ----
+def install(storage, out_dir=DEFAULT_OUT_DIR):
+    """Republish the games touched by each write of `storage` in a background thread."""
+    lock, publishing = threading.Lock(), threading.Lock()
+    pending = set()
+
+    def run():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                games = set(pending)
+                pending.clear()
+            try:
+                with publishing:
+                    publish(storage, out_dir, games)
+            except Exception as e:  # publishing must never break the write that triggered it
+                print(f"Snapshot publishing failed: {e}")
+
+    def on_write(storage, paths, commit_message):
+        games = games_in_paths(paths)
+        if not games:
+            return
+        with lock:
+            idle = not pending
+            pending.update(games)
+        if idle:
+            threading.Thread(target=run, daemon=True).start()
+
+    storage.add_listener(on_write)
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish static leaderboard snapshots.")
+    parser.add_argument("games", nargs="*", help="games to republish (default: all)")
+    parser.add_argument("--out", default=os.getenv("LEADERBOARD_PUBLISH_DIR", DEFAULT_OUT_DIR))
+    parser.add_argument("--every", type=int, default=0, help="repeat every N seconds")
+    args = parser.parse_args()
+
+    storage = get_storage("local")
+    while True:
+        manifest = publish(storage, args.out, set(args.games) or None)
+        print(f"Published {len(manifest['games'])} game(s) to {args.out}")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
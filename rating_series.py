@@ -0,0 +1,215 @@
+"""
+Per-player rating time series: (match number, time, μ, σ) after every match.
+
+Stored next to each history shard as "<shard>.ratings": a JSON header line
+followed by little-endian columns (player id, match number, time, μ, σ) for
+the rows produced by that shard's matches. The header carries the ratings at
+the start of the shard and a hash chain over the earlier shards and the
+TrueSkill parameters. A sidecar whose chain still matches is therefore valid
+as a starting point even if its own shard has grown. An append re-rates only
+the new matches, and anything stale is rebuilt from the last valid sidecar,
+never from scratch unless nothing is valid.
+
+RatingSeries holds one game's columns in memory and answers as_of(player,
+when) and at_match(player, n) in O(log n), plus series slices, with no replay.
+"""
+import bisect
+import calendar
+import hashlib
+import json
+import sys
+from array import array
+from datetime import datetime
+
+COLUMNS = (("player", "I"), ("match", "I"), ("time", "d"), ("mu", "d"), ("sigma", "d"))
+
+def parse_time(timestamp):
+    """Seconds since the epoch for a stored timestamp (naive times are taken as UTC), or None."""
+    if not timestamp:
+        return None
+    try:
+        moment = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if moment.tzinfo:
+        return moment.timestamp()
+    return calendar.timegm(moment.timetuple()) + moment.microsecond / 1e6
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def chain_hashes(shards, key):
+    """Chain value each shard's sidecar must carry: covers the parameters and every earlier shard."""
+    chains = []
+    chain = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    for shard in shards:
+        chains.append(chain)
+        chain = hashlib.sha1(f"{chain}:{shard.get('sha')}".encode("ascii")).hexdigest()[:12]
+    return chains
+
+# ---- Sidecar encoding ----
+def encode_sidecar(shard_sha, chain, count, start, rows):
+    """rows: [(player, match number, time, mu, sigma)] in match order."""
+    players = list(dict.fromkeys(row[0] for row in rows))
+    ids = {p: i for i, p in enumerate(players)}
+    header = json.dumps({
+        "sha": shard_sha, "chain": chain, "count": count, "rows": len(rows),
+        "players": players, "start": start,
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(len(header) + 1) % 8) + b"\n"  # keep the columns 8-byte aligned
+    columns = [array("I", [ids[r[0]] for r in rows])]
+    columns += [array(code, [r[k] for r in rows]) for k, (_, code) in enumerate(COLUMNS) if k > 0]
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    return header + b"".join(column.tobytes() for column in columns)
+
+def decode_header(raw):
+    if not raw:
+        return None
+    end = bytes(raw[:1 << 20]).find(b"\n")
+    if end < 0:
+        return None
+    try:
+        header = json.loads(bytes(raw[:end]))
+    except ValueError:
+        return None
+    header["_offset"] = end + 1
+    return header
+
+def decode_rows(raw, header):
+    """[(player, match, time, mu, sigma)] of a sidecar."""
+    n, position, columns = header["rows"], header["_offset"], []
+    for _, code in COLUMNS:
+        column = array(code)
+        size = n * column.itemsize
+        column.frombytes(bytes(raw[position:position + size]))
+        if sys.byteorder != "little":
+            column.byteswap()
+        columns.append(column)
+        position += size
+    players = header["players"]
+    return [(players[p], m, t, mu, s) for p, m, t, mu, s in zip(*columns)]
+
+def end_state(start, rows):
+    state = {p: list(v) for p, v in start.items()}
+    for player, _, _, mu, sigma in rows:
+        state[player] = [mu, sigma]
+    return state
+
+def rate_rows(matches, first_number, start, env):
+    """(rows, end state) from replaying `matches` on top of the ratings in `start`."""
+    from ratings import rate_match
+    board = {p: {"mu": mu, "sigma": sigma, "wins": 0} for p, (mu, sigma) in start.items()}
+    rows = []
+    for number, match in enumerate(matches, start=first_number):
+        rate_match(board, match, env)
+        moment = parse_time(match.get("timestamp"))
+        moment = float("nan") if moment is None else moment
+        for team in match["teams"]:
+            for player in team:
+                rows.append((player, number, moment, board[player]["mu"], board[player]["sigma"]))
+    return rows, {p: [r["mu"], r["sigma"]] for p, r in board.items()}
+
+def sync_sidecars(shards, chains, read, matches_of, env, appended=None):
+    """
+    Bring the sidecars of `shards` up to date.
+
+    read(k) returns the current sidecar bytes of shard k (or None) and
+    matches_of(k) its matches. `appended` = (old sha, old count) of the newest
+    shard when the caller only appended to it. Returns {k: new sidecar bytes}.
+    """
+    k, header = len(shards) - 1, None
+    while k >= 0:
+        header = decode_header(read(k))
+        if header and header.get("chain") == chains[k]:
+            break
+        k -= 1
+    if k < 0:
+        k, start, kept = 0, {}, []
+    else:
+        start = header["start"]
+        kept = []
+        if header.get("sha") == shards[k].get("sha"):
+            if k == len(shards) - 1:
+                return {}
+            start = end_state(start, decode_rows(read(k), header))
+            k += 1
+        elif appended and k == len(shards) - 1 and header.get("sha") == appended[0] and header.get("count") == appended[1]:
+            kept = decode_rows(read(k), header)
+
+    first_number = sum(s["count"] for s in shards[:k]) + 1
+    updated = {}
+    for j in range(k, len(shards)):
+        matches = matches_of(j)
+        done = len(kept) and header["count"]
+        rows, end = rate_rows(matches[done:], first_number + done, end_state(start, kept) if kept else start, env)
+        updated[j] = encode_sidecar(shards[j].get("sha"), chains[j], len(matches), start, kept + rows)
+        first_number += len(matches)
+        start, kept = end, []
+    return updated
+
+
+class RatingSeries:
+    """One game's rating history as per-player columns."""
+
+    def __init__(self):
+        self._columns = {}  # player -> (match numbers, times, mu, sigma)
+
+    @classmethod
+    def from_rows(cls, rows):
+        series = cls()
+        for player, number, moment, mu, sigma in rows:
+            columns = series._columns.get(player)
+            if columns is None:
+                columns = series._columns[player] = (array("I"), array("d"), array("d"), array("d"))
+            # Undated or out-of-order matches take the previous time so each column stays sorted
+            if columns[1] and not moment >= columns[1][-1]:
+                moment = columns[1][-1]
+            elif moment != moment:  # NaN: undated and first
+                moment = float("-inf")
+            columns[0].append(number)
+            columns[1].append(moment)
+            columns[2].append(mu)
+            columns[3].append(sigma)
+        return series
+
+    def players(self):
+        return list(self._columns)
+
+    def __contains__(self, player):
+        return player in self._columns
+
+    def __len__(self):
+        return sum(len(c[0]) for c in self._columns.values())
+
+    def _point(self, player, i):
+        numbers, times, mus, sigmas = self._columns[player]
+        return {"match": numbers[i], "time": times[i], "mu": mus[i], "sigma": sigmas[i]}
+
+    def as_of(self, player, when):
+        """Rating of `player` after their last match at or before `when` (datetime, ISO string or epoch), or None."""
+        if isinstance(when, str):
+            when = parse_time(when)
+        elif isinstance(when, datetime):
+            when = parse_time(when.isoformat())
+        if player not in self._columns or when is None:
+            return None
+        i = bisect.bisect_right(self._columns[player][1], when) - 1
+        return self._point(player, i) if i >= 0 else None
+
+    def at_match(self, player, number):
+        """Rating of `player` after match `number` (1-based, game-wide), or None before their first match."""
+        if player not in self._columns:
+            return None
+        i = bisect.bisect_right(self._columns[player][0], number) - 1
+        return self._point(player, i) if i >= 0 else None
+
+    def series(self, player, start=None, stop=None):
+        """(match numbers, times, mu, sigma) of `player` for game-wide match numbers in [start, stop)."""
+        if player not in self._columns:
+            return array("I"), array("d"), array("d"), array("d")
+        numbers = self._columns[player][0]
+        lo = 0 if start is None else bisect.bisect_left(numbers, start)
+        hi = len(numbers) if stop is None else bisect.bisect_left(numbers, stop)
+        return tuple(column[lo:hi] for column in self._columns[player])
@@ -0,0 +1,147 @@
+"""
+Shared TrueSkill helpers.
+
+trueskill is only imported the first time an environment is needed, so
+importing this module (and the entry points that use it) stays cheap.
+Games can have their own fitted parameters (see fit_params.py), stored in
+leaderboards/trueskill_params.json and picked up by get_env(game, storage).
+"""
+
+import math
+
+DEFAULT_PARAMS = {"mu": 25.0, "sigma": 25.0 / 3, "beta": 25.0 / 6, "tau": 25.0 / 300, "draw_probability": 0.0}
+
+_envs = {}
+_params = {}
+
+def make_env(params=None):
+    import trueskill
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    return trueskill.TrueSkill(
+        mu=params["mu"], sigma=params["sigma"], beta=params["beta"],
+        tau=params["tau"], draw_probability=params["draw_probability"],
+    )
+
+def game_params(game_name, storage):
+    """
+    Fitted parameters of a game, or the defaults. Cached per storage until
+    the stored parameters change, so a long-running process picks up a
+    fit_params.py --apply at its next rating.
+    """
+    version = storage.trueskill_params_version()
+    cached = _params.get(storage)
+    if cached is None or cached[0] != version:
+        cached = _params[storage] = (version, storage.load_trueskill_params())
+    fitted = cached[1].get(game_name, {})
+    return {key: fitted.get(key, value) for key, value in DEFAULT_PARAMS.items()}
+
+def reload_params():
+    """Forget cached parameters/environments (after fitting new ones)."""
+    _params.clear()
+    _envs.clear()
+
+def get_env(game_name=None, storage=None):
+    """The TrueSkill environment for a game; the default one without a game or storage."""
+    if game_name is None or storage is None:
+        params = DEFAULT_PARAMS
+    else:
+        params = game_params(game_name, storage)
+    key = tuple(sorted(params.items()))
+    if key not in _envs:
+        _envs[key] = make_env(params)
+    return _envs[key]
+
+def conservative(mu, sigma):
+    """Conservative rating (μ - 3σ) used for ranking."""
+    return mu - 3 * sigma
+
+# Per-player aggregates kept in each leaderboard entry next to mu/sigma.
+# rate_match() updates them in O(match size); entries written before they
+# existed lack some keys, so read them through stats_of().
+STATS = {
+    "played": 0, "wins": 0, "podiums": 0, "streak": 0, "best_streak": 0,
+    "last_played": None, "peak": None,
+}
+
+def new_entry(env=None):
+    env = env or get_env()
+    return {"mu": env.mu, "sigma": env.sigma, **STATS}
+
+def stats_of(entry):
+    """The aggregates of a leaderboard entry, with defaults for missing ones."""
+    return {key: entry.get(key, default) for key, default in STATS.items()}
+
+def update_stats(entry, place, places, timestamp):
+    """
+    Count one rated match in a player's aggregates. `place` is the team's
+    0-based position among the match's `places` distinct finishing positions,
+    so any rank numbering works. A win is a first place (ties included); a
+    podium is a top-three finish ahead of at least one team.
+    """
+    entry["played"] = entry.get("played", 0) + 1
+    if place == 0:
+        entry["wins"] = entry.get("wins", 0) + 1
+        entry["streak"] = entry.get("streak", 0) + 1
+        entry["best_streak"] = max(entry.get("best_streak", 0), entry["streak"])
+    else:
+        entry["streak"] = 0
+    if place < min(3, places - 1):
+        entry["podiums"] = entry.get("podiums", 0) + 1
+    if timestamp:
+        entry["last_played"] = timestamp
+    rating = conservative(entry["mu"], entry["sigma"])
+    if entry.get("peak") is None or rating > entry["peak"]:
+        entry["peak"] = rating
+
+def _rate_two_teams(leaderboard, teams, ranks, env):
+    """
+    Closed-form TrueSkill update for two teams. With two teams the factor graph
+    converges in a single pass, so this gives the same result as env.rate()
+    without building the graph (roughly 20x faster).
+    """
+    first, second = (0, 1) if ranks[0] <= ranks[1] else (1, 0)
+    ahead, behind = teams[first], teams[second]
+    tau_sq = env.tau ** 2
+    variance = {p: leaderboard[p]["sigma"] ** 2 + tau_sq for team in teams for p in team}
+    c = math.sqrt(sum(variance.values()) + len(variance) * env.beta ** 2)
+    margin = env.ppf((env.draw_probability + 1) / 2.0) * math.sqrt(len(variance)) * env.beta / c
+    diff = (sum(leaderboard[p]["mu"] for p in ahead) - sum(leaderboard[p]["mu"] for p in behind)) / c
+    if ranks[0] == ranks[1]:
+        v, w = env.v_draw(diff, margin), env.w_draw(diff, margin)
+    else:
+        v, w = env.v_win(diff, margin), env.w_win(diff, margin)
+    for team, sign in ((ahead, 1), (behind, -1)):
+        for player in team:
+            entry, var = leaderboard[player], variance[player]
+            entry["mu"] += sign * var / c * v
+            entry["sigma"] = math.sqrt(var * (1 - var / c ** 2 * w))
+
+def rate_match(leaderboard, match, env=None):
+    """Apply one teams/ranks match to a {name: {"mu", "sigma", stats...}} leaderboard in place."""
+    env = env or get_env()
+    teams, ranks = match["teams"], match["ranks"]
+    for team in teams:
+        for player in team:
+            if player not in leaderboard:
+                leaderboard[player] = new_entry(env)
+    if len(teams) == 2:
+        _rate_two_teams(leaderboard, teams, ranks, env)
+    else:
+        team_ratings = [[env.create_rating(leaderboard[p]["mu"], leaderboard[p]["sigma"]) for p in team] for team in teams]
+        new_team_ratings = env.rate(team_ratings, ranks=ranks)
+        for team, new_ratings in zip(teams, new_team_ratings):
+            for player, new_rating in zip(team, new_ratings):
+                leaderboard[player]["mu"], leaderboard[player]["sigma"] = new_rating.mu, new_rating.sigma
+    places, timestamp = sorted(set(ranks)), match.get("timestamp")
+    for team, rank in zip(teams, ranks):
+        for player in team:
+            update_stats(leaderboard[player], places.index(rank), len(places), timestamp)
+    return leaderboard
+
+def replay(matches, env=None):
+    """Rebuild a leaderboard from scratch by rating every match in order."""
+    env = env or get_env()
+    leaderboard = {}
+    for match in matches:
+        rate_match(leaderboard, match, env)
+    return leaderboard
@@ -0,0 +1,109 @@
+"""
+Rename a player, or merge a duplicate into an existing player, across every game.
+
+    py rename_player.py Tyler Tyler2            # rename
+    py rename_player.py tyler Tyler             # merge "tyler" into "Tyler"
+    py rename_player.py tyler Tyler --dry-run   # only show what would change
+
+Games are processed one at a time. In each game only the history shards that
+mention the player are rewritten. A pure rename just moves the rating to the
+new name. A merge replays that game's history, because the combined record
+rates differently. players.json, every touched leaderboard and every touched
+shard are written in one batch, i.e. a single GitLab commit.
+"""
+import argparse
+
+from ratings import get_env, replay
+from storage import encode_leaderboard, get_storage, leaderboard_path
+
+def rename_in_match(match, old, new):
+    """The match with `old` replaced by `new`, or None if `old` did not play."""
+    if not any(old in team for team in match["teams"]):
+        return None
+    teams = []
+    for team in match["teams"]:
+        renamed = []
+        for player in team:
+            player = new if player == old else player
+            if player not in renamed:
+                renamed.append(player)
+        teams.append(renamed)
+    players = [p for team in teams for p in team]
+    if len(players) != len(set(players)):
+        raise ValueError(f"{old} and {new} played against each other ({match.get('timestamp') or 'undated match'})")
+    return {**match, "teams": teams}
+
+def rename_files(storage, old, new):
+    """(files to write, report lines) for renaming or merging `old` into `new` everywhere."""
+    if not new or old == new:
+        raise ValueError("Pick a different new name.")
+    files, report = {}, []
+
+    players = storage.load_players()
+    if old in players:
+        renamed = [new if p == old else p for p in players]
+        renamed = [p for i, p in enumerate(renamed) if p not in renamed[:i]]
+        files.update(storage.players_file(renamed))
+        report.append(f"players.json: {old} → {new}" + (" (already listed, merged)" if new in players else ""))
+
+    for game_name in storage.list_games():
+        leaderboard = storage.load_leaderboard(game_name)
+        changed = 0
+
+        def transform(match):
+            nonlocal changed
+            result = rename_in_match(match, old, new)
+            changed += result is not None
+            return result
+
+        history, matches = storage.rewrite_history_files(game_name, transform)
+        if old not in leaderboard and not changed:
+            continue
+        merge = new in leaderboard
+        if merge:
+            after = replay(matches, get_env(game_name, storage))
+        else:
+            after = {new if p == old else p: r for p, r in leaderboard.items()}
+        files.update(history)
+        files[leaderboard_path(game_name)] = encode_leaderboard(after)
+
+        shards = sum(1 for p in history if "_history/" in p and p.endswith(".json") and not p.endswith("/index.json"))
+        report.append(f"{game_name}: {changed} match(es) rewritten" + (f" in {shards} shard(s)" if shards else ""))
+        for name in (old, new):
+            if name in leaderboard:
+                r = leaderboard[name]
+                report.append(f"  - {name:12} μ={r['mu']:.2f} σ={r['sigma']:.2f} wins={r['wins']}")
+        if new in after:
+            r = after[new]
+            report.append(f"  + {new:12} μ={r['mu']:.2f} σ={r['sigma']:.2f} wins={r['wins']}")
+        if merge:
+            moved = [p for p in after if p != new and abs(after[p]["mu"] - leaderboard.get(p, after[p])["mu"]) > 1e-9]
+            if moved:
+                report.append(f"    ratings of {len(moved)} other player(s) change after the replay")
+    return files, report
+
+def rename_player(storage, old, new, dry_run=False):
+    """Rename/merge `old` into `new` in one write; returns the report lines."""
+    with storage.transaction():
+        files, report = rename_files(storage, old, new)
+        if files and not dry_run:
+            storage.write_files(files, f"Rename player {old} to {new}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Rename a player or merge a duplicate across all games.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--dry-run", action="store_true", help="show the changes, write nothing")
+    args = parser.parse_args()
+    try:
+        report = rename_player(get_storage("local"), args.old, args.new.strip(), args.dry_run)
+    except ValueError as e:
+        print(e)
+        return
+    print("\n".join(report) or f"{args.old} does not appear anywhere.")
+    if args.dry_run and report:
+        print("\nDry run: nothing written.")
+
+if __name__ == "__main__":
+    main()
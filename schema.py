@@ -0,0 +1,92 @@
+"""
+Versioned on-disk schema.
+
+Version 2 (current):
+    players.json          {"schema_version": 2, "players": [name, ...]}
+    <game>_leaderboard    {"schema_version": 2, "players": {name: {"mu", "sigma", "wins", ...stats}},
+                           "undo": [{"match", "before"}, ...]}
+                          (stats: see ratings.STATS; "undo" is record_match's journal,
+                          optional, for the newest matches)
+    history shard         {"schema_version": 2, "matches": [match, ...]}
+    match                 {"teams": [[name, ...], ...], "ranks": [int, ...], "timestamp": str}
+                          (pages also keep "type": "1v1" / "team" / "ffa" for display)
+
+Anything without a schema_version is version 1 and is converted by the
+functions below. Loaders only call them for files the migrator
+(migrate_schema.py) has not converted yet.
+"""
+
+SCHEMA_VERSION = 2
+
+DEFAULT_MU = 25.0
+DEFAULT_SIGMA = 25.0 / 3
+
+def is_current(data):
+    return isinstance(data, dict) and data.get("schema_version") == SCHEMA_VERSION
+
+# ---- Players ----
+def migrate_players(data):
+    """[name, ...] from any version of players.json."""
+    if isinstance(data, dict) and isinstance(data.get("players"), list):
+        return list(data["players"])
+    if isinstance(data, dict):
+        return list(data.keys())
+    if isinstance(data, list):
+        return list(data)
+    return []
+
+# ---- Leaderboards ----
+def migrate_leaderboard(data):
+    """{name: {"mu", "sigma", "wins"}} from any version of a leaderboard file."""
+    if is_current(data):
+        return data["players"]
+    if not isinstance(data, dict):
+        return {}
+    leaderboard = {}
+    for player, value in data.items():
+        if isinstance(value, (list, tuple)) and len(value) == 2:  # old CLI format [mu, sigma]
+            leaderboard[player] = {"mu": value[0], "sigma": value[1], "wins": 0}
+        elif isinstance(value, dict):
+            leaderboard[player] = {
+                "mu": value.get("mu", DEFAULT_MU),
+                "sigma": value.get("sigma", DEFAULT_SIGMA),
+                "wins": value.get("wins", 0),
+            }
+        else:
+            leaderboard[player] = {"mu": DEFAULT_MU, "sigma": DEFAULT_SIGMA, "wins": 0}
+    return leaderboard
+
+# ---- Matches ----
+def migrate_match(match):
+    """Convert one version 1 match (CLI or page format) to teams/ranks."""
+    if "teams" in match and "ranks" in match:
+        return match
+    match_type = match.get("type")
+    winner = match.get("winner")
+    converted = {"type": match_type} if match_type else {}
+    if match_type == "team":
+        team1 = match.get("team1") or match.get("team_a") or []
+        team2 = match.get("team2") or match.get("team_b") or []
+        converted["teams"] = [list(team1), list(team2)]
+        converted["ranks"] = [1, 0] if winner == "Team 2" else [0, 1]
+    elif match_type in ("1v1", "individual"):
+        players = match.get("players") or match.get("results") or []
+        converted["teams"] = [[p] for p in players]
+        converted["ranks"] = [0 if p == winner else 1 for p in players]
+    else:  # "ffa": players are stored in finishing order
+        players = match.get("players") or []
+        converted["teams"] = [[p] for p in players]
+        converted["ranks"] = list(range(len(players)))
+    if match.get("timestamp"):
+        converted["timestamp"] = match["timestamp"]
+    return converted
+
+def migrate_matches(data):
+    """[match, ...] from any version of a history file or shard."""
+    if is_current(data):
+        return data["matches"]
+    if isinstance(data, dict):
+        data = data.get("matches", [])
+    if not isinstance(data, list):
+        return []
+    return [migrate_match(m) for m in data]
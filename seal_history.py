@@ -0,0 +1,43 @@
+"""
+Background job that seals completed history shards.
+
+    py seal_history.py                 # seal every game once
+    py seal_history.py --every 3600    # keep running, once an hour
+
+A shard is sealed once its month is over; appends then always start a new
+shard, so sealed shards never change and can be cached indefinitely. Rating
+series sidecars left stale (e.g. by new fitted parameters) are rebuilt too.
+"""
+import argparse
+import time
+from ratings import reload_params
+from storage import get_storage
+
+def seal_all(storage):
+    reload_params()  # pick up parameters fitted since the last pass
+    total = 0
+    for game_name in storage.list_games():
+        sealed = storage.seal_history(game_name)
+        if sealed:
+            print(f"{game_name}: sealed {sealed} shard(s)")
+        total += sealed
+        with storage.transaction():
+            files = storage.series_files(game_name)
+            if files:
+                storage.write_files(files, f"Rebuild {game_name} rating series")
+                print(f"{game_name}: rebuilt {len(files)} rating series file(s)")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Seal completed history shards.")
+    parser.add_argument("--every", type=int, default=0, help="repeat every N seconds")
+    args = parser.parse_args()
+    storage = get_storage("local")
+    while True:
+        seal_all(storage)
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
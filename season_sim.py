@@ -0,0 +1,176 @@
+"""
+Monte Carlo season simulator.
+
+    py season_sim.py scythe                      # 100k seasons of 20 games
+    py season_sim.py scythe --seasons 20000 --games 10 --players Carson Tyler Brandon
+
+Each simulated season draws every player's true skill once from their current
+N(μ, σ²), then plays `games` free-for-all games where each performance is
+skill + N(0, β²). Players score (players - finishing position) points per game
+and the season is ranked by total points (ties broken at random).
+Seasons are sampled in vectorized NumPy chunks spread over a process pool.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+CHUNK_SEASONS = 5000
+
+@dataclass
+class SeasonResult:
+    players: list
+    seasons: int
+    games: int
+    position_counts: np.ndarray   # [player, finishing position] -> seasons
+    points_hist: np.ndarray       # [player, season points] -> seasons
+    settle_hist: np.ndarray       # [game from which the champion leads for good] -> seasons
+
+    def position_probabilities(self):
+        return self.position_counts / self.seasons
+
+    def win_probability(self):
+        return self.position_probabilities()[:, 0]
+
+    def expected_points(self):
+        points = np.arange(self.points_hist.shape[1])
+        return (self.points_hist * points).sum(axis=1) / self.seasons
+
+    def points_interval(self, level=0.95):
+        """(low, high) season points per player at the given confidence level."""
+        cdf = np.cumsum(self.points_hist, axis=1) / self.seasons
+        tail = (1 - level) / 2
+        low = (cdf < tail).sum(axis=1)
+        high = (cdf < 1 - tail).sum(axis=1)
+        return low, high
+
+    def settle_quantile(self, q):
+        """Game number from which the eventual champion leads for good, at quantile q."""
+        cdf = np.cumsum(self.settle_hist) / self.seasons
+        return int(np.searchsorted(cdf, q))
+
+    def rows(self):
+        """Table rows sorted by chance of finishing first."""
+        probabilities = self.position_probabilities()
+        expected = self.expected_points()
+        low, high = self.points_interval()
+        order = np.argsort(-probabilities[:, 0], kind="stable")
+        rows = []
+        for p in order:
+            row = {"Player": self.players[p], "P(1st)": f"{probabilities[p, 0]:.1%}"}
+            for position in range(1, len(self.players)):
+                row[f"P({_ordinal(position + 1)})"] = f"{probabilities[p, position]:.1%}"
+            row["Expected points"] = f"{expected[p]:.1f}"
+            row["95% interval"] = f"{low[p]}–{high[p]}"
+            rows.append(row)
+        return rows
+
+def _ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def _simulate_chunk(args):
+    """Simulate one chunk of seasons; returns histograms so chunks merge cheaply."""
+    mu, sigma, beta, games, seasons, seed = args
+    rng = np.random.default_rng(seed)
+    n = len(mu)
+    skills = rng.normal(mu, sigma, size=(seasons, n))
+    performance = skills[:, None, :] + rng.normal(0.0, beta, size=(seasons, games, n))
+    # Rank within each game: best performance gets n - 1 points, worst gets 0
+    points = performance.argsort(axis=2).argsort(axis=2)
+    cumulative = points.cumsum(axis=1)
+    totals = cumulative[:, -1, :]
+
+    # Random tie-break for the final standings
+    order = np.lexsort((rng.random((seasons, n)), -totals), axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n)[None, :], axis=1)
+    position_counts = np.zeros((n, n), dtype=np.int64)
+    for player in range(n):
+        position_counts[player] = np.bincount(positions[:, player], minlength=n)
+
+    max_points = games * (n - 1)
+    points_hist = np.zeros((n, max_points + 1), dtype=np.int64)
+    for player in range(n):
+        points_hist[player] = np.bincount(totals[:, player], minlength=max_points + 1)
+
+    # First game from which the running leader is the eventual champion for good
+    champion = order[:, 0]
+    last_wrong = np.zeros(seasons, dtype=np.int64)
+    if games > 1:
+        leader = cumulative[:, :-1, :].argmax(axis=2)
+        wrong = leader != champion[:, None]
+        last_wrong = np.where(wrong.any(axis=1), games - 1 - np.argmax(wrong[:, ::-1], axis=1), 0)
+    settle_hist = np.bincount(last_wrong + 1, minlength=games + 1)
+    return position_counts, points_hist, settle_hist
+
+def simulate_season(leaderboard, players=None, seasons=100_000, games=20, beta=None, workers=None, seed=None):
+    """Simulate `seasons` seasons of `games` games among `players` (default: everyone)."""
+    if beta is None:
+        from ratings import DEFAULT_PARAMS
+        beta = DEFAULT_PARAMS["beta"]
+    players = list(players or leaderboard)
+    unknown = [p for p in players if p not in leaderboard]
+    if unknown:
+        raise ValueError(f"Not on the leaderboard: {', '.join(unknown)}")
+    if len(players) < 2:
+        raise ValueError("Need at least 2 players to simulate a season.")
+    mu = np.array([leaderboard[p]["mu"] for p in players])
+    sigma = np.array([leaderboard[p]["sigma"] for p in players])
+
+    sizes = [CHUNK_SEASONS] * (seasons // CHUNK_SEASONS)
+    if seasons % CHUNK_SEASONS:
+        sizes.append(seasons % CHUNK_SEASONS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(mu, sigma, beta, games, size, s) for size, s in zip(sizes, seeds)]
+
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_chunk, jobs))
+    else:
+        parts = [_simulate_chunk(job) for job in jobs]
+
+    return SeasonResult(
+        players=players,
+        seasons=seasons,
+        games=games,
+        position_counts=sum(p[0] for p in parts),
+        points_hist=sum(p[1] for p in parts),
+        settle_hist=sum(p[2] for p in parts),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate seasons from the current leaderboard.")
+    parser.add_argument("game")
+    parser.add_argument("--seasons", type=int, default=100_000)
+    parser.add_argument("--games", type=int, default=20, help="games per season")
+    parser.add_argument("--players", nargs="+", help="players taking part (default: everyone)")
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    from ratings import game_params
+    from storage import get_storage
+    storage = get_storage("local")
+    leaderboard = storage.load_leaderboard(args.game)
+    if not leaderboard:
+        print(f"No leaderboard for {args.game}.")
+        return
+    try:
+        beta = game_params(args.game, storage)["beta"]
+        result = simulate_season(leaderboard, args.players, args.seasons, args.games, beta, args.workers, args.seed)
+    except ValueError as e:
+        print(e)
+        return
+
+    print(f"\n=== {args.seasons:,} simulated seasons of {args.games} games: {args.game.title()} ===")
+    for row in result.rows():
+        print(f"{row['Player']:10} | P(1st)={row['P(1st)']:>6} | points {row['Expected points']:>6} ({row['95% interval']})")
+    print(f"\nThe champion leads for good from game {result.settle_quantile(0.5)} (median), "
+          f"and by game {result.settle_quantile(0.9)} in 90% of seasons.")
+
+if __name__ == "__main__":
+    main()
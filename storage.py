@@ -0,0 +1,965 @@
+"""
+Storage backends for players, leaderboards and match histories.
+
+Every entry point (CLI, Streamlit apps and pages) goes through a `Storage`
+so the same code runs against local files, GitLab or plain memory.
+The backend is chosen with the LEADERBOARD_BACKEND environment variable
+("local", "gitlab" or "memory"); each entry point passes its own default.
+
+Several leagues (groups of players) can share one deployment. Code always
+uses the "leaderboards/..." paths below; a Storage scoped to a league maps
+them into that league's own folder, so one league never reads or writes
+another's files. The league comes from LEADERBOARD_LEAGUE or the caller.
+"""
+import contextlib
+import copy
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from file_lock import FileLock, atomic_write, fsync_dir, remove
+from global_ranking import game_summary
+from partitioned_cache import PartitionedLRU
+from ratings import game_params, get_env, rate_match, replay
+from rating_series import (
+    RatingSeries, chain_hashes, decode_header, decode_rows, params_key, rate_rows, sync_sidecars,
+)
+from history_log import (
+    HistoryView, encode_shard, append_to_shard, pop_from_shard, encode_offsets, decode_offsets,
+)
+from schema import (
+    SCHEMA_VERSION, is_current, migrate_players, migrate_leaderboard, migrate_matches,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEADERBOARDS = "leaderboards"
+PLAYERS_PATH = f"{LEADERBOARDS}/players.json"
+PARAMS_PATH = f"{LEADERBOARDS}/trueskill_params.json"
+# Per-game summaries for the cross-game ranking (see global_ranking.py)
+SUMMARIES_PATH = f"{LEADERBOARDS}/game_summaries.json"
+
+# ---- Leagues ----
+# The default league keeps the original flat layout; every other league lives
+# in leaderboards/leagues/<league>/ with the same structure inside, including
+# its own players.json and trueskill_params.json. leagues.json lists them.
+DEFAULT_LEAGUE = "default"
+LEAGUES_PATH = f"{LEADERBOARDS}/leagues.json"
+
+def normalize_league(name):
+    """Validated league name (empty means the default league); raises ValueError."""
+    league = (name or "").strip().lower() or DEFAULT_LEAGUE
+    if not re.fullmatch(r"[a-z0-9][a-z0-9_-]*", league):
+        raise ValueError(f"Invalid league name {name!r}: use letters, digits, '-' and '_'")
+    return league
+
+def league_root(league):
+    return LEADERBOARDS if league == DEFAULT_LEAGUE else f"{LEADERBOARDS}/leagues/{league}"
+
+def configured_league():
+    return normalize_league(os.getenv("LEADERBOARD_LEAGUE"))
+
+# ---- Paths ----
+def leaderboard_path(game_name):
+    return f"{LEADERBOARDS}/{game_name}_leaderboard.json"
+
+def leaderboard_game(path):
+    """Game name of a leaderboard path, or None for any other file."""
+    name = path[len(LEADERBOARDS) + 1:] if path.startswith(LEADERBOARDS + "/") else ""
+    if "/" not in name and name.endswith("_leaderboard.json"):
+        return name[: -len("_leaderboard.json")]
+    return None
+
+def history_path(game_name):
+    return f"{LEADERBOARDS}/{game_name}_history.json"
+
+# ---- History shards ----
+# Each game's history lives in leaderboards/<game>_history/ as one compact JSON
+# file per month (split further every SHARD_MAX_MATCHES matches) plus index.json,
+# which lists the shards in order with their match count and content hash.
+# Every shard has a "<name>.idx" offset sidecar (see history_log.py).
+SHARD_MAX_MATCHES = int(os.getenv("HISTORY_SHARD_SIZE", "500"))
+SHARD_READ_WORKERS = 8
+# Cached shards and rating series, shared fairly by all leagues of a backend
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "512"))
+SERIES_CACHE_SIZE = 16
+# Newest recorded matches that undo_match can take back without a replay
+UNDO_DEPTH = 20
+
+def history_dir(game_name):
+    return f"{LEADERBOARDS}/{game_name}_history"
+
+def shard_index_path(game_name):
+    return f"{history_dir(game_name)}/index.json"
+
+def shard_path(game_name, shard_name):
+    return f"{history_dir(game_name)}/{shard_name}.json"
+
+def shard_offsets_path(game_name, shard_name):
+    return f"{history_dir(game_name)}/{shard_name}.idx"
+
+def series_path(game_name, shard_name):
+    return f"{history_dir(game_name)}/{shard_name}.ratings"
+
+def shard_files(game_name, shard, content, offsets):
+    """Files for one shard (content + offset sidecar); updates the index entry in place."""
+    sha = content_sha(content)
+    shard.update(count=len(offsets) - 1, sha=sha)
+    return {
+        shard_path(game_name, shard["name"]): content,
+        shard_offsets_path(game_name, shard["name"]): encode_offsets(sha, offsets),
+    }
+
+def games_in_paths(paths):
+    """Names of the games whose leaderboard or history is among `paths`."""
+    games = set()
+    for path in paths:
+        name = path.split("/", 1)[-1]
+        if name.endswith("_leaderboard.json"):
+            games.add(name[: -len("_leaderboard.json")])
+        elif "_history/" in name:
+            games.add(name.split("_history/", 1)[0])
+    return games
+
+def match_month(match, default=None):
+    """YYYY-MM of a match timestamp (works for both the CLI and the page formats)."""
+    timestamp = match.get("timestamp") or ""
+    if len(timestamp) >= 7 and timestamp[4] == "-":
+        return timestamp[:7]
+    return default or datetime.utcnow().strftime("%Y-%m")
+
+def next_shard_name(month, existing):
+    name, n = month, 1
+    while name in existing:
+        name = f"{month}.{n}"
+        n += 1
+    return name
+
+def split_into_shards(matches, taken=()):
+    """[(shard name, matches)] in history order; names in `taken` are not reused."""
+    shards = []
+    month = None
+    for match in matches:
+        month = match_month(match, month)
+        if not shards or shards[-1][0][:7] != month or len(shards[-1][1]) >= SHARD_MAX_MATCHES:
+            shards.append((next_shard_name(month, [*taken, *(name for name, _ in shards)]), []))
+        shards[-1][1].append(match)
+    return shards
+
+def content_sha(content):
+    return hashlib.sha1(content).hexdigest()[:12]
+
+def encode_leaderboard(leaderboard, undo=None):
+    """Leaderboard file content; `undo` is record_match's journal (dropped by any other writer)."""
+    data = {"schema_version": SCHEMA_VERSION, "players": leaderboard}
+    if undo:
+        data["undo"] = undo[-UNDO_DEPTH:]
+    return encode_json(data)
+
+def undo_record(leaderboard, match):
+    """Journal entry for `match`: each of its players' entries before it (None for newcomers)."""
+    before = {p: dict(leaderboard[p]) if p in leaderboard else None for team in match["teams"] for p in team}
+    return {"match": match, "before": before}
+
+def encode_json(data):
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+def decode_json(raw, default=None):
+    if raw is None:
+        return default
+    try:
+        return json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+    except ValueError:
+        return default
+
+
+class Storage:
+    """
+    Base class. Backends implement the three file primitives
+    (`read_bytes`, `_write_files`, `list_dir`); everything else is shared.
+    """
+
+    def __init__(self):
+        # (game, shard name) -> (content hash, matches). A cached shard is only
+        # used while its hash still matches the index, so it can never be stale.
+        # Partitioned by league; league-scoped copies share these caches.
+        self._shard_cache = PartitionedLRU(SHARD_CACHE_SIZE)
+        # game -> (history version, RatingSeries)
+        self._series_cache = PartitionedLRU(SERIES_CACHE_SIZE)
+        self._root = self
+        self._leagues = {}
+        self._leagues_lock = threading.Lock()
+        self._scope(DEFAULT_LEAGUE)
+
+    def _scope(self, league):
+        """Per-league state: paths, lock, listeners and the group-commit queue."""
+        self.league = league
+        self._registered = league == DEFAULT_LEAGUE
+        self._listeners = []
+        self._lock = self._make_lock()
+        # Group commit: matches queued by concurrent record_match calls
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._committer = threading.Lock()
+
+    def _make_lock(self):
+        return threading.RLock()
+
+    # ---- Leagues ----
+    def for_league(self, league):
+        """This backend scoped to `league`. Instances are shared, so their caches survive reruns."""
+        league = normalize_league(league)
+        root = self._root
+        if league == DEFAULT_LEAGUE:
+            return root
+        with root._leagues_lock:
+            if league not in root._leagues:
+                scoped = copy.copy(root)
+                scoped._scope(league)
+                root._leagues[league] = scoped
+            return root._leagues[league]
+
+    def list_leagues(self):
+        """Registered leagues, the default league first."""
+        data = self.read_json(LEAGUES_PATH, {})
+        names = data.get("leagues", []) if isinstance(data, dict) else []
+        return [DEFAULT_LEAGUE, *sorted(set(names) - {DEFAULT_LEAGUE})]
+
+    def _leagues_file(self, leagues):
+        names = sorted(set(leagues) - {DEFAULT_LEAGUE})
+        return {LEAGUES_PATH: encode_json({"schema_version": SCHEMA_VERSION, "leagues": names})}
+
+    def add_league(self, league):
+        """Register a league and return its storage."""
+        scoped = self.for_league(league)
+        with self._root.transaction():
+            leagues = self.list_leagues()
+            if scoped.league not in leagues:
+                self._root.write_files(self._leagues_file([*leagues, scoped.league]), f"Add league {scoped.league}")
+        scoped._registered = True
+        return scoped
+
+    def _physical(self, path):
+        """Backend path of a "leaderboards/..." path in this storage's league."""
+        if self.league == DEFAULT_LEAGUE or path == LEAGUES_PATH:
+            return path
+        if path == LEADERBOARDS or path.startswith(LEADERBOARDS + "/"):
+            return league_root(self.league) + path[len(LEADERBOARDS):]
+        return path
+
+    def transaction(self):
+        """
+        Held around every read-modify-write so concurrent writers cannot
+        interleave. Re-entrant; the local backend also locks across processes.
+        """
+        return self._lock
+
+    # ---- Write listeners ----
+    def add_listener(self, callback):
+        """Call callback(storage, paths, commit_message) after every successful write."""
+        self._listeners.append(callback)
+
+    def write_files(self, files, commit_message):
+        """Write {path: bytes or None (delete)} as one batch, then notify listeners."""
+        with self.transaction():
+            files = {**files, **self._summary_updates(files)}
+            if not self._registered:
+                # A league's first write also registers it, in the same batch
+                with self._root.transaction():
+                    leagues = self.list_leagues()
+                    if self.league not in leagues:
+                        files = {**files, **self._leagues_file([*leagues, self.league])}
+                    self._write_files(files, commit_message)
+                self._registered = True
+            else:
+                self._write_files(files, commit_message)
+        for callback in self._listeners:
+            callback(self, list(files), commit_message)
+
+    # ---- Primitives ----
+    def read_bytes(self, path):
+        """Return the file content as bytes, or None if it does not exist."""
+        raise NotImplementedError
+
+    def _write_files(self, files, commit_message):
+        """Write {path: bytes or None (delete)} as one batch (one commit where the backend has commits)."""
+        raise NotImplementedError
+
+    def list_dir(self, directory):
+        """Names of the files directly inside `directory`."""
+        raise NotImplementedError
+
+    def open_buffer(self, path):
+        """Read-only buffer over a file (an mmap where the backend can); b"" if missing."""
+        return self.read_bytes(path) or b""
+
+    # ---- JSON helpers ----
+    def read_json(self, path, default=None):
+        return decode_json(self.read_bytes(path), default)
+
+    def write_json(self, path, data, commit_message):
+        self.write_files({path: encode_json(data)}, commit_message)
+
+    # ---- Players ----
+    def load_players(self):
+        data = self.read_json(PLAYERS_PATH, [])
+        if is_current(data):
+            return data["players"]
+        return migrate_players(data)
+
+    def players_file(self, players):
+        return {PLAYERS_PATH: encode_json({"schema_version": SCHEMA_VERSION, "players": list(players)})}
+
+    def save_players(self, players, commit_message="Update players list"):
+        self.write_files(self.players_file(players), commit_message)
+
+    # ---- TrueSkill parameters (fit_params.py) ----
+    def load_trueskill_params(self):
+        """{game: {"mu", "sigma", "beta", "tau", "draw_probability", ...}} for games with fitted parameters."""
+        data = self.read_json(PARAMS_PATH, {})
+        return data.get("games", {}) if isinstance(data, dict) else {}
+
+    def trueskill_params_version(self):
+        """Changes whenever the stored parameters do (the file's content here)."""
+        return self.read_bytes(PARAMS_PATH)
+
+    def trueskill_params_file(self, params):
+        return {PARAMS_PATH: encode_json({"schema_version": SCHEMA_VERSION, "games": params})}
+
+    # ---- Game summaries (global_ranking.py) ----
+    def load_summaries(self):
+        """{"scheme", "games": {game: summary}}, or None until global_ranking has built them."""
+        data = self.read_json(SUMMARIES_PATH)
+        return {"scheme": data.get("scheme", {}), "games": data["games"]} if is_current(data) else None
+
+    def summaries_file(self, summaries):
+        return {SUMMARIES_PATH: encode_json({"schema_version": SCHEMA_VERSION, **summaries})}
+
+    def _summary_updates(self, files):
+        """The summaries file refreshed for the leaderboards in `files` ({} if nothing to do)."""
+        games = {g: content for g, content in ((leaderboard_game(p), c) for p, c in files.items()) if g}
+        if not games or SUMMARIES_PATH in files:
+            return {}
+        summaries = self.load_summaries()
+        if summaries is None:
+            return {}  # never built: the first ranking builds them from every leaderboard
+        for game, content in games.items():
+            if content is None:
+                summaries["games"].pop(game, None)
+                continue
+            data = decode_json(content, {})
+            summaries["games"][game] = game_summary(data["players"] if is_current(data) else migrate_leaderboard(data))
+        return self.summaries_file(summaries)
+
+    # ---- Games ----
+    def list_games(self):
+        suffix = "_leaderboard.json"
+        return sorted({n[: -len(suffix)] for n in self.list_dir(LEADERBOARDS) if n.endswith(suffix)})
+
+    def load_leaderboard(self, game_name):
+        """Returns {player: {"mu", "sigma", "wins", ...stats}} (see ratings.STATS)."""
+        return self.load_leaderboard_state(game_name)[0]
+
+    def load_leaderboard_state(self, game_name):
+        """(leaderboard, undo journal); the journal lists the newest recorded matches, oldest first."""
+        data = self.read_json(leaderboard_path(game_name), {})
+        if is_current(data):
+            return data["players"], data.get("undo", [])
+        return migrate_leaderboard(data), []
+
+    def save_leaderboard(self, game_name, leaderboard, commit_message=None):
+        if commit_message is None:
+            commit_message = f"Update {game_name} leaderboard"
+        self.write_files({leaderboard_path(game_name): encode_leaderboard(leaderboard)}, commit_message)
+
+    # ---- History (time-sharded) ----
+    def load_shard_index(self, game_name):
+        """The shard index of a game, or None if it still uses a single legacy history file."""
+        index = self.read_json(shard_index_path(game_name))
+        if isinstance(index, dict) and isinstance(index.get("shards"), list):
+            return index
+        return None
+
+    def _read_shard(self, game_name, shard):
+        key = (game_name, shard["name"])
+        cached = self._shard_cache.get(self.league, key)
+        if cached is None or cached[0] != shard.get("sha"):
+            data = self.read_json(shard_path(game_name, shard["name"]), {})
+            matches = data["matches"] if is_current(data) else migrate_matches(data)
+            cached = (shard.get("sha"), matches)
+            self._shard_cache.put(self.league, key, cached)
+        return cached[1]
+
+    def load_history(self, game_name, recent=None):
+        """
+        Returns the list of matches (oldest first).
+        With `recent`, only the newest shards covering at least that many matches are read.
+        """
+        index = self.load_shard_index(game_name)
+        if index is None:
+            matches = migrate_matches(self.read_json(history_path(game_name), []))
+            return matches[-recent:] if recent else matches
+
+        shards = index["shards"]
+        if recent:
+            needed, total = [], 0
+            for shard in reversed(shards):
+                needed.insert(0, shard)
+                total += shard["count"]
+                if total >= recent:
+                    break
+            shards = needed
+        with ThreadPoolExecutor(max_workers=SHARD_READ_WORKERS) as pool:
+            parts = list(pool.map(lambda shard: self._read_shard(game_name, shard), shards))
+        matches = [m for part in parts for m in part]
+        return matches[-recent:] if recent else matches
+
+    def history_view(self, game_name):
+        """Random access to single matches or ranges without loading the whole history."""
+        return HistoryView(self, game_name)
+
+    def shard_buffer(self, game_name, shard):
+        return self.open_buffer(shard_path(game_name, shard["name"]))
+
+    def shard_offsets(self, game_name, shard):
+        """Offsets of the matches in a shard, or None if its sidecar is missing or stale."""
+        return decode_offsets(self.read_bytes(shard_offsets_path(game_name, shard["name"])), shard["sha"])
+
+    def _newest_shard(self, game_name, shard):
+        """(content, offsets) of a shard, re-encoding it if it has no usable sidecar."""
+        offsets = self.shard_offsets(game_name, shard)
+        if offsets is not None:
+            content = self.read_bytes(shard_path(game_name, shard["name"]))
+            if content is not None and len(offsets) == shard["count"] + 1:
+                return content, list(offsets)
+        return encode_shard(self._read_shard(game_name, shard))
+
+    def history_files(self, game_name, matches, unchanged=0):
+        """
+        Files that replace the whole history of a game with `matches`, of which
+        the first `unchanged` are known to be the stored ones. Shards that end
+        before that point are kept as they are; the rest are rewritten (only if
+        their content changed) and keep the sealed flag of the shard they replace.
+        """
+        old_index = self.load_shard_index(game_name)
+        files = {history_path(game_name): None} if old_index is None else {}
+        old_shards = (old_index or {}).get("shards", [])
+        index = {"schema_version": SCHEMA_VERSION, "shards": []}
+        start = 0
+        for shard in old_shards:
+            if start + shard["count"] >= unchanged:
+                break
+            index["shards"].append(shard)
+            start += shard["count"]
+        kept = [shard["name"] for shard in index["shards"]]
+        old = {shard["name"]: shard for shard in old_shards}
+        rewritten = split_into_shards(matches[start:], kept)
+        for name, shard_matches in rewritten:
+            shard = {"name": name, **({"sealed": True} if old.get(name, {}).get("sealed") else {})}
+            written = shard_files(game_name, shard, *encode_shard(shard_matches))
+            if shard["sha"] != old.get(name, {}).get("sha"):
+                files.update(written)
+            index["shards"].append(shard)
+        written = {shard["name"] for shard in index["shards"]}
+        for shard in old_shards:
+            if shard["name"] not in written:
+                files[shard_path(game_name, shard["name"])] = None
+                files[shard_offsets_path(game_name, shard["name"])] = None
+                files[series_path(game_name, shard["name"])] = None
+        files[shard_index_path(game_name)] = encode_json(index)
+        files.update(self.series_files(game_name, index, dict(rewritten)))
+        return files
+
+    def rewrite_history_files(self, game_name, transform):
+        """
+        (files, matches) for applying transform(match) -> new match, or None for
+        "unchanged", to a game's whole history. Only shards that actually change
+        are rewritten; `matches` is the resulting history.
+        """
+        index = self.load_shard_index(game_name)
+        if index is None:
+            old = self.load_history(game_name)
+            matches = [transform(m) or m for m in old]
+            changed = any(a is not b for a, b in zip(old, matches))
+            return (self.history_files(game_name, matches) if changed else {}), matches
+        self.load_history(game_name)  # fetch all shards in parallel into the cache
+        files, matches, pending = {}, [], {}
+        for shard in index["shards"]:
+            shard_matches = list(self._read_shard(game_name, shard))
+            changed = False
+            for i, match in enumerate(shard_matches):
+                new = transform(match)
+                if new is not None:
+                    shard_matches[i], changed = new, True
+            if changed:
+                files.update(shard_files(game_name, shard, *encode_shard(shard_matches)))
+                pending[shard["name"]] = shard_matches
+            matches.extend(shard_matches)
+        if files:
+            files[shard_index_path(game_name)] = encode_json(index)
+            files.update(self.series_files(game_name, index, pending))
+        return files, matches
+
+    # ---- Rating series (rating_series.py) ----
+    def _series_sync(self, game_name, index, pending=None, appended=None):
+        """
+        (new sidecars, sidecars read, chain values), keyed by shard position.
+        `pending` maps shard names to matches that are not written yet.
+        """
+        shards = index["shards"]
+        chains = chain_hashes(shards, params_key(game_params(game_name, self)))
+        pending = pending or {}
+        raws = {}
+
+        def read(k):
+            if k not in raws:
+                raws[k] = self.read_bytes(series_path(game_name, shards[k]["name"]))
+            return raws[k]
+
+        def matches_of(k):
+            name = shards[k]["name"]
+            return pending[name] if name in pending else self._read_shard(game_name, shards[k])
+
+        updated = sync_sidecars(shards, chains, read, matches_of, get_env(game_name, self), appended)
+        return updated, raws, chains
+
+    def series_files(self, game_name, index=None, pending=None, appended=None):
+        """Rating-series sidecars that are missing or stale, as {path: bytes}."""
+        index = index or self.load_shard_index(game_name)
+        if index is None:
+            return {}
+        updated, _, _ = self._series_sync(game_name, index, pending, appended)
+        return {series_path(game_name, index["shards"][k]["name"]): raw for k, raw in updated.items()}
+
+    def history_version(self, game_name, index=None):
+        """Short hash that changes whenever the game's history or its TrueSkill parameters change."""
+        index = index or self.load_shard_index(game_name)
+        digest = hashlib.sha1(params_key(game_params(game_name, self)).encode("utf-8"))
+        if index is None:
+            digest.update(self.read_bytes(history_path(game_name)) or b"")
+        else:
+            digest.update(" ".join(str(s.get("sha")) for s in index["shards"]).encode("ascii"))
+        return digest.hexdigest()[:16]
+
+    def rating_series(self, game_name):
+        """
+        The RatingSeries of a game, read from its sidecars. Stale sidecars are
+        recomputed in memory only; writers and seal_history.py persist them.
+        """
+        index = self.load_shard_index(game_name)
+        if index is None:
+            rows, _ = rate_rows(self.load_history(game_name), 1, {}, get_env(game_name, self))
+            return RatingSeries.from_rows(rows)
+        shards = index["shards"]
+        key = self.history_version(game_name, index)
+        cached = self._series_cache.get(self.league, game_name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        updated, raws, chains = self._series_sync(game_name, index)
+        missing = [k for k in range(len(shards)) if k not in updated and k not in raws]
+        read = lambda k: self.read_bytes(series_path(game_name, shards[k]["name"]))
+        with ThreadPoolExecutor(max_workers=SHARD_READ_WORKERS) as pool:
+            raws.update(zip(missing, pool.map(read, missing)))
+        rows = []
+        for k, shard in enumerate(shards):
+            raw = updated.get(k) or raws[k]
+            header = decode_header(raw)
+            if not header or header.get("chain") != chains[k] or header.get("sha") != shard.get("sha"):
+                # An older sidecar is missing or damaged: rebuild everything in memory
+                rows, _ = rate_rows(self.load_history(game_name), 1, {}, get_env(game_name, self))
+                break
+            rows.extend(decode_rows(raw, header))
+        series = RatingSeries.from_rows(rows)
+        self._series_cache.put(self.league, game_name, (key, series))
+        return series
+
+    def save_history(self, game_name, matches, commit_message=None):
+        if commit_message is None:
+            commit_message = f"Update {game_name} history"
+        self.write_files(self.history_files(game_name, matches), commit_message)
+
+    def save_game(self, game_name, leaderboard, matches, commit_message=None):
+        """Write leaderboard and history together in one batch."""
+        if commit_message is None:
+            commit_message = f"Update {game_name}"
+        files = self.history_files(game_name, matches)
+        files[leaderboard_path(game_name)] = encode_leaderboard(leaderboard)
+        self.write_files(files, commit_message)
+
+    def append_match(self, game_name, match, leaderboard=None, commit_message=None):
+        """Append one match (see append_matches)."""
+        self.append_matches(game_name, [match], leaderboard, commit_message)
+
+    def append_matches(self, game_name, matches, leaderboard=None, commit_message=None, undo=None):
+        """
+        Append matches in one write. Only the newest shard(s) and the shard index
+        are written (plus the leaderboard and its undo journal, if given), so the
+        cost does not grow with history.
+        """
+        if commit_message is None:
+            commit_message = f"Record {game_name} match" + ("es" if len(matches) > 1 else "")
+        with self.transaction():
+            files = self.append_files(game_name, matches)
+            if leaderboard is not None:
+                files[leaderboard_path(game_name)] = encode_leaderboard(leaderboard, undo)
+            self.write_files(files, commit_message)
+
+    def append_files(self, game_name, matches):
+        """History files that append `matches`: only the newest shard(s) and the index."""
+        index = self.load_shard_index(game_name)
+        if index is None:
+            # First write after upgrading: split the legacy file into shards
+            return self.history_files(game_name, self.load_history(game_name) + list(matches))
+        shards = index["shards"]
+        files, touched = {}, {}
+        newest = shards[-1] if shards else None
+        appended = newest and (newest.get("sha"), newest["count"])
+        current = None  # (content, offsets) of `newest` once it has been touched
+        for match in matches:
+            month = match_month(match, newest["name"][:7] if newest else None)
+            count = len(current[1]) - 1 if current else newest and newest["count"]
+            if newest and not newest.get("sealed") and count < SHARD_MAX_MATCHES and month <= newest["name"][:7]:
+                current = append_to_shard(*(current or self._newest_shard(game_name, newest)), match)
+            else:
+                if current:
+                    files.update(shard_files(game_name, newest, *current))
+                    touched[newest["name"]] = current[0]
+                newest = {"name": next_shard_name(month, [s["name"] for s in shards])}
+                shards.append(newest)
+                current = encode_shard([match])
+        files.update(shard_files(game_name, newest, *current))
+        touched[newest["name"]] = current[0]
+        files[shard_index_path(game_name)] = encode_json(index)
+        pending = {name: json.loads(content)["matches"] for name, content in touched.items()}
+        files.update(self.series_files(game_name, index, pending, appended))
+        return files
+
+    def record_match(self, game_name, match, commit_message=None):
+        """
+        Rate `match` against the stored leaderboard and append it; returns the
+        leaderboard afterwards. Safe for concurrent writers: matches queued while
+        another call is writing are rated and written together in one batch
+        (one commit / one set of fsyncs), in the order they arrived.
+        """
+        pending = {"game": game_name, "match": match, "done": False, "result": None, "error": None}
+        with self._queue_lock:
+            self._queue.append(pending)
+        with self._committer:
+            if pending["done"]:
+                if pending["error"]:
+                    raise pending["error"]
+                return pending["result"]
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+            by_game = {}
+            for item in batch:
+                by_game.setdefault(item["game"], []).append(item)
+            for game, items in by_game.items():
+                try:
+                    with self.transaction():
+                        leaderboard, undo = self.load_leaderboard_state(game)
+                        env = get_env(game, self)
+                        for item in items:
+                            undo.append(undo_record(leaderboard, item["match"]))
+                            rate_match(leaderboard, item["match"], env)
+                            item["result"] = json.loads(json.dumps(leaderboard))
+                        message = commit_message if len(batch) == 1 else None
+                        self.append_matches(game, [item["match"] for item in items], leaderboard, message, undo)
+                except Exception as e:
+                    for item in items:
+                        item["error"] = e
+                for item in items:
+                    item["done"] = True
+        if pending["error"]:
+            raise pending["error"]
+        return pending["result"]
+
+    def pop_match(self, game_name, commit_message=None):
+        """Remove and return the newest match (None if there is none), touching only the newest shard."""
+        if commit_message is None:
+            commit_message = f"Undo last {game_name} match"
+        with self.transaction():
+            files, match = self._pop_files(game_name)
+            if match is not None:
+                self.write_files(files, commit_message)
+            return match
+
+    def undo_match(self, game_name, commit_message=None):
+        """
+        Remove the newest match from history and leaderboard in one write;
+        returns (match or None, leaderboard). Ratings and stats of the match's
+        players are restored from the undo journal, so this costs O(match size);
+        only a match the journal does not cover (recorded before an import,
+        reset or recalculation) falls back to a replay.
+        """
+        if commit_message is None:
+            commit_message = f"Undo last {game_name} match"
+        with self.transaction():
+            files, match = self._pop_files(game_name)
+            leaderboard, undo = self.load_leaderboard_state(game_name)
+            if match is None:
+                return None, leaderboard
+            if undo and undo[-1]["match"] == match:
+                for player, before in undo.pop()["before"].items():
+                    if before is None:
+                        leaderboard.pop(player, None)
+                    else:
+                        leaderboard[player] = before
+            else:
+                undo = []
+                leaderboard = replay(self.load_history(game_name)[:-1], get_env(game_name, self))
+            files[leaderboard_path(game_name)] = encode_leaderboard(leaderboard, undo)
+            self.write_files(files, commit_message)
+            return match, leaderboard
+
+    def _pop_files(self, game_name):
+        """(files, match) that remove the newest match from the history; match is None if it is empty."""
+        index = self.load_shard_index(game_name)
+        if index is None:
+            matches = self.load_history(game_name)
+            if not matches:
+                return {}, None
+            match = matches.pop()
+            return self.history_files(game_name, matches), match
+        shards = index["shards"]
+        while shards and shards[-1]["count"] == 0:
+            shards.pop()
+        if not shards:
+            return {}, None
+        newest = shards[-1]
+        content, offsets, match = pop_from_shard(*self._newest_shard(game_name, newest))
+        pending = {}
+        if len(offsets) > 1:
+            # A sealed shard stays sealed; later matches start a new shard
+            files = shard_files(game_name, newest, content, offsets)
+            pending[newest["name"]] = json.loads(content)["matches"]
+        else:
+            shards.pop()
+            files = {
+                shard_path(game_name, newest["name"]): None,
+                shard_offsets_path(game_name, newest["name"]): None,
+                series_path(game_name, newest["name"]): None,
+            }
+        files[shard_index_path(game_name)] = encode_json(index)
+        files.update(self.series_files(game_name, index, pending))
+        return files, match
+
+    def seal_history(self, game_name, before_month=None):
+        """
+        Mark every shard of a month before `before_month` (default: this month) as sealed.
+        Sealed shards never receive appends again. Returns the number of shards sealed.
+        """
+        if before_month is None:
+            before_month = datetime.utcnow().strftime("%Y-%m")
+        with self.transaction():
+            index = self.load_shard_index(game_name)
+            if index is None:
+                return 0
+            sealed = 0
+            for shard in index["shards"]:
+                if not shard.get("sealed") and shard["name"][:7] < before_month:
+                    shard["sealed"] = True
+                    sealed += 1
+            if sealed:
+                self.write_json(shard_index_path(game_name), index, f"Seal {sealed} {game_name} history shard(s)")
+            return sealed
+
+    def delete_game(self, game_name, commit_message=None):
+        if commit_message is None:
+            commit_message = f"Wipe {game_name}"
+        with self.transaction():
+            files = {leaderboard_path(game_name): None, history_path(game_name): None}
+            for name in self.list_dir(history_dir(game_name)):
+                files[f"{history_dir(game_name)}/{name}"] = None
+            self.write_files(files, commit_message)
+
+
+# ---- In-memory backend (tests, demos) ----
+class MemoryStorage(Storage):
+    def __init__(self, files=None):
+        super().__init__()
+        self.files = dict(files or {})
+        self.commits = []
+
+    def read_bytes(self, path):
+        return self.files.get(self._physical(path))
+
+    def _write_files(self, files, commit_message):
+        files = {self._physical(path): content for path, content in files.items()}
+        for path, content in files.items():
+            if content is None:
+                self.files.pop(path, None)
+            else:
+                self.files[path] = content
+        self.commits.append((commit_message, sorted(files)))
+
+    def list_dir(self, directory):
+        prefix = self._physical(directory.rstrip("/")) + "/"
+        return [p[len(prefix):] for p in self.files if p.startswith(prefix) and "/" not in p[len(prefix):]]
+
+
+# ---- Local filesystem backend ----
+class LocalStorage(Storage):
+    def __init__(self, root=BASE_DIR):
+        self.root = root
+        super().__init__()
+
+    def _make_lock(self):
+        # One lock file per league, so leagues never wait for each other
+        return FileLock(os.path.join(self.root, *league_root(self.league).split("/"), ".lock"))
+
+    def _full_path(self, path):
+        return os.path.join(self.root, *self._physical(path).split("/"))
+
+    def read_bytes(self, path):
+        try:
+            with open(self._full_path(path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def trueskill_params_version(self):
+        # A stat instead of a read; atomic_write gives every version a new inode
+        try:
+            stat = os.stat(self._full_path(PARAMS_PATH))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def open_buffer(self, path):
+        try:
+            with open(self._full_path(path), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return b""
+
+    def _write_files(self, files, commit_message):
+        # Each file is replaced atomically; the lock keeps other processes'
+        # batches from interleaving with this one
+        with self._lock:
+            directories = set()
+            for path, content in files.items():
+                full_path = self._full_path(path)
+                if content is None:
+                    remove(full_path)
+                else:
+                    atomic_write(full_path, content)
+                directories.add(os.path.dirname(full_path))
+            for directory in directories:
+                if os.path.isdir(directory):
+                    fsync_dir(directory)
+
+    def list_dir(self, directory):
+        full_path = self._full_path(directory)
+        if not os.path.isdir(full_path):
+            return []
+        return [
+            n for n in os.listdir(full_path)
+            if os.path.isfile(os.path.join(full_path, n)) and not n.startswith(".") and not n.endswith(".tmp")
+        ]
+
+
+# ---- GitLab backend ----
+class GitLabStorage(Storage):
+    """
+    Reads go through an on-disk mirror of the league's folder kept in sync with
+    the branch (gitlab_mirror.py); GITLAB_MIRROR_DIR=off reads every file from GitLab.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._mirrors = {}  # league -> GitLabMirror, or None when disabled
+        self._mirror_lock = threading.Lock()
+
+    def _scope(self, league):
+        super()._scope(league)
+        self._depth = 0
+
+    def mirror(self):
+        """This league's GitLabMirror (shared by its instances), or None when disabled."""
+        root = self._root
+        with root._mirror_lock:
+            if self.league not in root._mirrors:
+                from gitlab_mirror import GitLabMirror, default_directory
+                directory = default_directory(BASE_DIR)
+                if not directory:
+                    mirror = None
+                elif self.league == DEFAULT_LEAGUE:
+                    # The default league's folder holds the others under leagues/
+                    mirror = GitLabMirror(directory, LEADERBOARDS, excluded=[f"{LEADERBOARDS}/leagues"])
+                else:
+                    mirror = GitLabMirror(directory, league_root(self.league), shared=[LEAGUES_PATH])
+                root._mirrors[self.league] = mirror
+            return root._mirrors[self.league]
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # A read-modify-write starts from the branch head, not a mirror up to max_age old
+        with self._lock:
+            if self._depth == 0 and self.mirror():
+                self.mirror().refresh(force=True)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+
+    def read_bytes(self, path):
+        if self.mirror():
+            return self.mirror().read_bytes(self._physical(path))
+        from GitLab_Persistence import gitlab_raw_get_bytes
+        status, content = gitlab_raw_get_bytes(self._physical(path))
+        return content if status == 200 else None
+
+    def _write_files(self, files, commit_message):
+        files = {self._physical(path): content for path, content in files.items()}
+        if self.mirror():
+            self.mirror().commit(files, commit_message)
+            return
+        from GitLab_Persistence import gitlab_commit_files
+        gitlab_commit_files(files, commit_message)
+
+    def list_dir(self, directory):
+        if self.mirror():
+            return self.mirror().list_dir(self._physical(directory))
+        from GitLab_Persistence import gitlab_list_tree
+        return gitlab_list_tree(self._physical(directory))
+
+
+# ---- Backend selection ----
+BACKENDS = {
+    "memory": MemoryStorage,
+    "local": LocalStorage,
+    "gitlab": GitLabStorage,
+}
+_instances = {}
+_installed = set()
+
+def get_storage(default="local", league=None):
+    """Shared storage instance for the configured backend and `league` (default: LEADERBOARD_LEAGUE)."""
+    name = os.getenv("LEADERBOARD_BACKEND", default).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LEADERBOARD_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    storage = _instances[name].for_league(configured_league() if league is None else league)
+    if (name, storage.league) not in _installed:
+        _installed.add((name, storage.league))
+        publish_dir = os.getenv("LEADERBOARD_PUBLISH_DIR")
+        if publish_dir:
+            import publish_snapshots
+            if storage.league != DEFAULT_LEAGUE:
+                publish_dir = os.path.join(publish_dir, storage.league)
+            publish_snapshots.install(storage, publish_dir)
+        api_url = os.getenv("LEADERBOARD_API_URL")
+        # api_server.py serves the configured league only
+        if api_url and storage.league == configured_league():
+            import change_feed
+            change_feed.install_notifier(storage, api_url)
+    return storage